@@ -0,0 +1,58 @@
+# Cold-start benchmark: stock tiktoken loader vs the vendored artifact.
+# Every sample runs in a fresh interpreter so nothing is reused between runs.
+#
+#   python tokenizer.py build
+#   python bench_startup.py --runs 10
+
+from pathlib import Path
+import argparse
+import statistics
+import subprocess
+import sys
+
+LOADERS = {
+    "stock": "import tiktoken; enc = tiktoken.get_encoding('{name}')",
+    "vendored": "from tokenizer import load_encoding; enc = load_encoding('{name}')",
+}
+
+SNIPPET = """
+import time
+start = time.perf_counter()
+{load}
+enc.encode("warm up")
+print(time.perf_counter() - start)
+"""
+
+
+def measure(loader: str, name: str, runs: int):
+    code = SNIPPET.format(load=LOADERS[loader].format(name=name))
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        samples.append(float(out.stdout.strip()) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--encodings", nargs="+", default=["o200k_base", "cl100k_base"])
+    args = parser.parse_args()
+
+    for name in args.encodings:
+        for loader in LOADERS:
+            samples = measure(loader, name, args.runs)
+            print(
+                f"{name:12} {loader:9} median {statistics.median(samples):8.1f} ms"
+                f"  min {min(samples):8.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
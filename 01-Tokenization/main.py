@@ -1,6 +1,6 @@
-import tiktoken
+from tokenizer import encoding_for_model
 
-enc = tiktoken.encoding_for_model("gpt-4o")
+enc = encoding_for_model("gpt-4o")
 
 text = "Hello, I am Yash"
 tokens = enc.encode(text)
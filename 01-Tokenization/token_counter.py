@@ -0,0 +1,114 @@
+# Token accounting for prompts, retrieved chunks and chat history
+#
+# Counts are cached by a hash of the text, so the same chunk coming back from
+# retrieval again and again is only tokenized once per process. Cache misses
+# are encoded together through encode_ordinary_batch on a thread pool.
+#
+# This is the one copy shared by every app: the dev container puts
+# 01-Tokenization on PYTHONPATH (see .devcontainer/devcontainer.json).
+# Encodings come from the vendored artifacts of tokenizer.py, never from the
+# network; a missing artifact raises FileNotFoundError on first use.
+
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+import os
+
+import xxhash
+
+from tokenizer import load_encoding as get_encoding
+
+ENCODING_NAME = os.getenv("TOKEN_ENCODING", "o200k_base")
+CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "50000"))
+BATCH_THREADS = int(os.getenv("TOKEN_BATCH_THREADS", "8"))
+# below this many cache misses the thread pool costs more than it saves
+PARALLEL_THRESHOLD = 16
+# chat format adds a few tokens per message plus the reply priming
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+_cache = OrderedDict()
+_lock = Lock()
+
+
+@lru_cache(maxsize=None)
+def encoding():
+    return get_encoding(ENCODING_NAME)
+
+
+def _key(text: str):
+    return xxhash.xxh3_128_digest(text.encode("utf-8", "surrogatepass"))
+
+
+def count_batch(texts):
+    """
+    Return the token count of every text, in input order.
+    """
+    texts = list(texts)
+    counts = [0] * len(texts)
+    misses = {}
+
+    with _lock:
+        for i, text in enumerate(texts):
+            key = _key(text)
+            count = _cache.get(key)
+            if count is None:
+                misses.setdefault(key, []).append(i)
+            else:
+                _cache.move_to_end(key)
+                counts[i] = count
+
+    if not misses:
+        return counts
+
+    keys = list(misses)
+    miss_texts = [texts[misses[key][0]] for key in keys]
+    enc = encoding()
+    if len(miss_texts) < PARALLEL_THRESHOLD:
+        encoded = [enc.encode_ordinary(text) for text in miss_texts]
+    else:
+        encoded = enc.encode_ordinary_batch(miss_texts, num_threads=BATCH_THREADS)
+
+    with _lock:
+        for key, tokens in zip(keys, encoded):
+            _cache[key] = len(tokens)
+            for i in misses[key]:
+                counts[i] = len(tokens)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    return counts
+
+
+def count_tokens(text: str):
+    return count_batch([text])[0]
+
+
+def _content(message):
+    content = message["content"] if isinstance(message, dict) else message.content
+    return content if isinstance(content, str) else str(content)
+
+
+def count_messages(messages):
+    """
+    Approximate prompt tokens for a list of chat messages (dicts or LangChain messages).
+    """
+    counts = count_batch(_content(message) for message in messages)
+    return sum(counts) + TOKENS_PER_MESSAGE * len(counts) + TOKENS_PER_REPLY
+
+
+def trim_history(messages, budget: int):
+    """
+    Keep the most recent messages whose combined size fits in the token budget.
+    """
+    messages = list(messages)
+    counts = count_batch(_content(message) for message in messages)
+
+    kept = 0
+    used = 0
+    for count in reversed(counts):
+        used += count + TOKENS_PER_MESSAGE
+        if used > budget:
+            break
+        kept += 1
+    return messages[len(messages) - kept:]
@@ -0,0 +1,137 @@
+# Offline tokenizer loader
+#
+# tiktoken.get_encoding() downloads the .tiktoken BPE file on first use and
+# base64-decodes ~200k lines every time a process starts. Here the ranks are
+# precompiled once into a flat binary file (offsets + ranks + raw token bytes),
+# so loading is one read and byte slicing: no network and no base64 or line
+# parsing. Each process still builds its own rank table from it, since
+# tiktoken's Rust core keeps a private hash map of the ranks.
+#
+# That table is most of the cold start, so loading cannot get down to a few
+# milliseconds with tiktoken.Encoding. bench_startup.py, 10 runs, tiktoken
+# 0.9.0, warm TIKTOKEN_CACHE_DIR for the stock loader (medians):
+#   o200k_base   stock 408 ms   vendored 333 ms
+#   cl100k_base  stock 280 ms   vendored 194 ms
+# Of the vendored o200k_base load, ~40 ms is importing tiktoken, ~130 ms is
+# building the ranks dict and ~200 ms is the Encoding (Rust CoreBPE)
+# constructor. The gain is skipping base64 decoding and the download.
+#
+# The artifacts are built when the dev container image is built (see
+# .devcontainer/Dockerfile, TIKTOKEN_VENDOR_DIR=/opt/tiktoken). Elsewhere build
+# them once on a machine with network access or a warm TIKTOKEN_CACHE_DIR:
+#   python tokenizer.py build o200k_base cl100k_base
+
+from array import array
+from functools import lru_cache
+from pathlib import Path
+import json
+import os
+import struct
+import sys
+
+import tiktoken
+from tiktoken.model import encoding_name_for_model
+
+VENDOR_DIR = Path(os.getenv("TIKTOKEN_VENDOR_DIR", Path(__file__).parent / "encodings"))
+VENDORED_ENCODINGS = ["o200k_base", "cl100k_base"]
+
+MAGIC = b"TKBPE001"
+HEADER = struct.Struct("<8sI")
+
+
+def artifact_path(name: str):
+    return VENDOR_DIR / f"{name}.bpe"
+
+
+def build_artifact(name: str):
+    # Use the stock constructor once to get ranks, pattern and special tokens
+    from tiktoken_ext.openai_public import ENCODING_CONSTRUCTORS
+
+    spec = ENCODING_CONSTRUCTORS[name]()
+    ranks = spec["mergeable_ranks"]
+    tokens = sorted(ranks, key=ranks.get)
+
+    header = json.dumps({
+        "name": spec["name"],
+        "pat_str": spec["pat_str"],
+        "special_tokens": spec["special_tokens"],
+        "explicit_n_vocab": spec.get("explicit_n_vocab"),
+        "count": len(tokens),
+    }).encode()
+    # keep the uint32 arrays 4-byte aligned so they can be cast in place
+    header += b" " * (-(HEADER.size + len(header)) % 4)
+
+    offsets = array("I", [0])
+    for token in tokens:
+        offsets.append(offsets[-1] + len(token))
+    rank_values = array("I", [ranks[token] for token in tokens])
+
+    VENDOR_DIR.mkdir(parents=True, exist_ok=True)
+    path = artifact_path(name)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(header)))
+        f.write(header)
+        f.write(offsets.tobytes())
+        f.write(rank_values.tobytes())
+        f.write(b"".join(tokens))
+    os.replace(tmp_path, path)
+    return path
+
+
+def _load_artifact(path: Path):
+    buf = path.read_bytes()
+    magic, header_len = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a vendored BPE artifact")
+
+    start = HEADER.size
+    header = json.loads(buf[start:start + header_len])
+    count = header["count"]
+
+    start += header_len
+    offsets = array("I", buf[start:start + 4 * (count + 1)])
+    start += 4 * (count + 1)
+    rank_values = array("I", buf[start:start + 4 * count])
+    tokens = buf[start + 4 * count:]
+
+    mergeable_ranks = {
+        tokens[offsets[i]:offsets[i + 1]]: rank_values[i]
+        for i in range(count)
+    }
+
+    return tiktoken.Encoding(
+        name=header["name"],
+        pat_str=header["pat_str"],
+        mergeable_ranks=mergeable_ranks,
+        special_tokens=header["special_tokens"],
+        explicit_n_vocab=header["explicit_n_vocab"],
+    )
+
+
+@lru_cache(maxsize=None)
+def load_encoding(name: str):
+    """
+    Load an encoding from its vendored artifact. Never downloads: raises
+    FileNotFoundError when no artifact has been built for it.
+    """
+    path = artifact_path(name)
+    if not path.exists():
+        raise FileNotFoundError(
+            f"No vendored tokenizer artifact {path}; run 'python tokenizer.py build {name}' "
+            "or point TIKTOKEN_VENDOR_DIR at a directory that has one"
+        )
+    return _load_artifact(path)
+
+
+def encoding_for_model(model: str):
+    return load_encoding(encoding_name_for_model(model))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print("usage: python tokenizer.py build [encoding ...]")
+        sys.exit(1)
+
+    for name in sys.argv[2:] or VENDORED_ENCODINGS:
+        print(f"Built {build_artifact(name)}")
@@ -0,0 +1,81 @@
+# Throughput benchmark for the batch embedding client against a local mock
+# of the /embeddings endpoint (fixed latency per request, random vectors).
+#
+#   python bench_embeddings.py --texts 20000 --latency 0.2
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+import argparse
+import asyncio
+import base64
+import json
+import time
+
+import numpy as np
+
+from embedding_client import EmbeddingClient
+
+DIMENSIONS = 1536
+
+
+def mock_server(latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(latency)
+            vectors = np.random.rand(len(body["input"]), body.get("dimensions", DIMENSIONS)).astype(np.float32)
+            if body.get("encoding_format") == "base64":
+                data = [{"index": i, "embedding": base64.b64encode(v.tobytes()).decode()} for i, v in enumerate(vectors)]
+            else:
+                data = [{"index": i, "embedding": v.tolist()} for i, v in enumerate(vectors)]
+            payload = json.dumps({"data": data}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run(texts, base_url: str, max_items: int, max_in_flight: int):
+    client = EmbeddingClient(base_url=base_url, api_key="mock", max_items=max_items, max_in_flight=max_in_flight)
+    try:
+        start = time.perf_counter()
+        matrix = await client.embed(texts)
+        elapsed = time.perf_counter() - start
+    finally:
+        await client.aclose()
+    assert matrix.shape == (len(texts), DIMENSIONS) and matrix.dtype == np.float32
+    return len(texts) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--texts", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    server = mock_server(args.latency)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    texts = [f"dog chases cat number {i}" for i in range(args.texts)]
+
+    # one text per request, one request at a time, like main.py used to do
+    one_by_one = min(len(texts), 50)
+    rate = asyncio.run(run(texts[:one_by_one], base_url, max_items=1, max_in_flight=1))
+    print(f"{'1 per request, serial':32} {rate:10.0f} texts/sec")
+
+    for max_items, max_in_flight in [(256, 1), (256, 4), (256, 16)]:
+        rate = asyncio.run(run(texts, base_url, max_items=max_items, max_in_flight=max_in_flight))
+        print(f"{f'{max_items} per request, {max_in_flight} in flight':32} {rate:10.0f} texts/sec")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
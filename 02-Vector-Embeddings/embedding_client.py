@@ -0,0 +1,114 @@
+# Batch embedding client
+#
+# Splits any number of texts into sub-batches that respect the per-request
+# item and token limits of the embeddings endpoint, sends them concurrently
+# over one pooled HTTP connection set (bounded number of requests in flight)
+# and returns a single float32 matrix with rows in input order.
+
+import asyncio
+import base64
+import os
+
+import httpx
+import numpy as np
+
+try:
+    from tokenizer import load_encoding as get_encoding
+except ImportError:
+    from tiktoken import get_encoding
+
+BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+# text-embedding-3-* limits
+MAX_ITEMS = 2048
+MAX_TOKENS = 300_000
+MAX_INPUT_TOKENS = 8191
+MAX_IN_FLIGHT = 8
+RETRIES = 3
+
+
+def make_batches(token_counts, max_items: int = MAX_ITEMS, max_tokens: int = MAX_TOKENS):
+    """
+    Split inputs into contiguous (start, end) ranges within the item and token limits.
+    """
+    batches = []
+    start = 0
+    tokens = 0
+    for i, count in enumerate(token_counts):
+        if count > MAX_INPUT_TOKENS:
+            raise ValueError(f"Input {i} has {count} tokens, the limit is {MAX_INPUT_TOKENS}")
+        if i > start and (i - start >= max_items or tokens + count > max_tokens):
+            batches.append((start, i))
+            start = i
+            tokens = 0
+        tokens += count
+    if start < len(token_counts):
+        batches.append((start, len(token_counts)))
+    return batches
+
+
+class EmbeddingClient:
+    def __init__(
+        self,
+        model: str = "text-embedding-3-small",
+        dimensions: int = None,
+        base_url: str = BASE_URL,
+        api_key: str = None,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        max_items: int = MAX_ITEMS,
+        max_tokens: int = MAX_TOKENS,
+        timeout: float = 60.0,
+    ):
+        self.model = model
+        self.dimensions = dimensions
+        self.max_items = max_items
+        self.max_tokens = max_tokens
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.encoding = get_encoding("cl100k_base")
+        self.http = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key or os.getenv('OPENAI_API_KEY', '')}"},
+            limits=httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight),
+            timeout=timeout,
+        )
+
+    async def _embed_batch(self, texts):
+        body = {"model": self.model, "input": texts, "encoding_format": "base64"}
+        if self.dimensions:
+            body["dimensions"] = self.dimensions
+
+        async with self.semaphore:
+            for attempt in range(RETRIES + 1):
+                response = await self.http.post("/embeddings", json=body)
+                retry = response.status_code == 429 or response.status_code >= 500
+                if not retry or attempt == RETRIES:
+                    break
+                await asyncio.sleep(2 ** attempt)
+        response.raise_for_status()
+
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        # base64 float32 payloads decode straight into the matrix, no JSON floats
+        return np.stack([np.frombuffer(base64.b64decode(item["embedding"]), dtype=np.float32) for item in data])
+
+    async def embed(self, texts):
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, self.dimensions or 0), dtype=np.float32)
+
+        token_counts = [len(tokens) for tokens in self.encoding.encode_ordinary_batch(texts)]
+        batches = make_batches(token_counts, self.max_items, self.max_tokens)
+        results = await asyncio.gather(*(self._embed_batch(texts[start:end]) for start, end in batches))
+        return np.ascontiguousarray(np.concatenate(results), dtype=np.float32)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+def embed_texts(texts, **kwargs):
+    async def run():
+        client = EmbeddingClient(**kwargs)
+        try:
+            return await client.embed(texts)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
 from openai import OpenAI
+from embedding_client import embed_texts
 
 load_dotenv()
 
@@ -15,3 +16,8 @@ response = client.embeddings.create(
 print("Vector Embeddings", response)
 print(len(response.data[0].embedding))
 
+# Many texts at once: batched, concurrent requests, one float32 matrix back
+texts = ["dog chases cat", "cat chases mouse", "mouse eats cheese"]
+vectors = embed_texts(texts, model="text-embedding-3-small")
+
+print("Embedding matrix", vectors.shape, vectors.dtype)
@@ -1,10 +1,9 @@
 import streamlit as st
 from pathlib import Path
 from dotenv import load_dotenv
-from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_qdrant import QdrantVectorStore
+from vector_config import make_embeddings, get_or_create_vector_store
+from ingest import ingest_pdf
 from openai import OpenAI
 import tempfile
 
@@ -13,7 +12,7 @@ load_dotenv()
 
 # OpenAI Client
 client = OpenAI()
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+embeddings = make_embeddings()
 
 st.set_page_config(page_title="PDF Q&A with Qdrant", layout="centered")
 st.title("📄 RAG based Chatbot - Chat with your PDF")
@@ -58,21 +57,21 @@ if uploaded_file and not st.session_state.pdf_indexed:
 
     indexing_status.success("✅ PDF uploaded successfully!")
 
-    # Load and split PDF
-    loader = PyPDFLoader(tmp_path)
-    docs = loader.load()
+    # Stream pages through split -> embed -> store
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=400)
-    texts_split = text_splitter.split_documents(docs)
-
-    # Index into Qdrant
     indexing_status.info("📥 Indexing PDF into vector database...")
-    vector_store = QdrantVectorStore.from_documents(
-        documents=texts_split,
-        url=st.secrets["QDRANT_URL"],
-        api_key=st.secrets["QDRANT_API_KEY"],
+    vector_store = get_or_create_vector_store(
+        url=st.secrets.get("QDRANT_URL"),
+        api_key=st.secrets.get("QDRANT_API_KEY"),
         collection_name="uploaded_pdf_vector",
         embedding=embeddings
     )
+    ingest_pdf(
+        tmp_path,
+        vector_store,
+        text_splitter,
+        on_batch=lambda pages, chunks: indexing_status.info(f"📥 Indexed {chunks} chunks from {pages} pages...")
+    )
     indexing_status.success("✅ Indexing complete.")
     st.session_state.vector_store = vector_store
     st.session_state.pdf_indexed = True
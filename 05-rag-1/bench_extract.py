@@ -0,0 +1,35 @@
+# Pages/sec of parallel PDF text extraction for growing worker counts
+# (the text cache is bypassed so every run parses every page).
+#
+#   python bench_extract.py ./manuals
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+from corpus import extract_pages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory")
+    args = parser.parse_args()
+
+    paths = list(Path(args.directory).rglob("*.pdf"))
+    workers = 1
+    baseline = None
+    while True:
+        start = time.perf_counter()
+        pages = sum(len(p) for _, p in extract_pages(paths, workers=workers, use_cache=False))
+        rate = pages / (time.perf_counter() - start)
+        baseline = baseline or rate
+        print(f"{workers:3} workers {rate:10.1f} pages/sec  x{rate / baseline:.2f}")
+
+        if workers >= os.cpu_count():
+            break
+        workers = min(workers * 2, os.cpu_count())
+
+
+if __name__ == "__main__":
+    main()
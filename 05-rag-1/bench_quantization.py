@@ -0,0 +1,131 @@
+# Vector RAM and search latency for the collection layouts in vector_config
+#
+# Fills throwaway collections with random unit vectors, runs the same queries
+# against each layout and prints its RAM per million chunks next to the
+# measured p50/p95 search latency. The RAM is what Qdrant reports for the
+# collection's segments in /telemetry once indexing is done, scaled to 1M
+# points; the estimate column is vectors + HNSW layer 0 links by formula.
+#
+#   python bench_quantization.py --url http://vector-db:6333 --points 100000
+
+import argparse
+import statistics
+import time
+import uuid
+
+import httpx
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+HNSW_M = 16
+
+LAYOUTS = {
+    "3072 float32": (3072, None),
+    "1024 float32": (1024, None),
+    "3072 int8 + rescore": (3072, "scalar"),
+    "1024 int8 + rescore": (1024, "scalar"),
+    "3072 binary + rescore": (3072, "binary"),
+}
+
+
+def estimated_ram_per_million(dims: int, quantization):
+    if quantization == "scalar":
+        vector_bytes = dims
+    elif quantization == "binary":
+        vector_bytes = dims / 8
+    else:
+        vector_bytes = dims * 4
+    # layer 0 of the HNSW graph keeps 2 * m neighbour ids per point
+    return (vector_bytes + 2 * HNSW_M * 4) * 1_000_000 / 1024 ** 3
+
+
+def quantization_config(quantization):
+    if quantization == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if quantization == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def random_vectors(count: int, dims: int, rng):
+    vectors = rng.standard_normal((count, dims), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def collection_ram_bytes(url: str, name: str):
+    """
+    RAM of the collection's segments as reported by Qdrant's telemetry.
+    """
+    response = httpx.get(f"{url}/telemetry", params={"details_level": 10}, timeout=60)
+    response.raise_for_status()
+    for collection in response.json()["result"]["collections"]["collections"]:
+        if collection["id"] == name:
+            return sum(
+                segment["info"]["ram_usage_bytes"]
+                for shard in collection["shards"]
+                if shard.get("local")
+                for segment in shard["local"]["segments"]
+            )
+    raise LookupError(f"No telemetry for collection {name}")
+
+
+def wait_until_indexed(client, name: str):
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        time.sleep(1)
+
+
+def bench(client, url: str, dims: int, quantization, points: int, queries: int, k: int, rng):
+    name = f"bench_{uuid.uuid4().hex}"
+    client.create_collection(
+        collection_name=name,
+        vectors_config=models.VectorParams(size=dims, distance=models.Distance.COSINE, on_disk=bool(quantization)),
+        quantization_config=quantization_config(quantization),
+    )
+    try:
+        for start in range(0, points, 1000):
+            batch = random_vectors(min(1000, points - start), dims, rng)
+            client.upload_collection(name, vectors=batch, ids=range(start, start + len(batch)), wait=True)
+        wait_until_indexed(client, name)
+        ram = collection_ram_bytes(url, name) * 1_000_000 / points / 1024 ** 3
+
+        params = None
+        if quantization:
+            params = models.SearchParams(
+                quantization=models.QuantizationSearchParams(ignore=False, rescore=True, oversampling=2.0)
+            )
+
+        timings = []
+        for query in random_vectors(queries, dims, rng):
+            start = time.perf_counter()
+            client.query_points(name, query=query.tolist(), limit=k, search_params=params)
+            timings.append((time.perf_counter() - start) * 1000)
+        return ram, timings
+    finally:
+        client.delete_collection(name)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://vector-db:6333")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.url, timeout=120)
+    rng = np.random.default_rng(0)
+
+    print(f"{'layout':24} {'GiB / 1M (Qdrant)':>18} {'GiB / 1M (est.)':>16} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, (dims, quantization) in LAYOUTS.items():
+        ram, timings = bench(client, args.url, dims, quantization, args.points, args.queries, args.k, rng)
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        print(
+            f"{label:24} {ram:18.2f} {estimated_ram_per_million(dims, quantization):16.2f}"
+            f" {statistics.median(timings):8.2f} {p95:8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
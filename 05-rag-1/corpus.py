@@ -0,0 +1,153 @@
+# Corpus ingestion for a directory of PDFs
+#
+# Text extraction with pypdf is pure Python and CPU bound, so page ranges of
+# the next few PDFs are spread across a process pool. Each file's pages are
+# yielded in (file, page) order as soon as they are done, so ingest starts
+# on the first file while the rest are still being parsed. The extracted text
+# is cached by the PDF's SHA-256 so unchanged files are never parsed again.
+#
+#   python corpus.py ./manuals --collection manuals_vector --workers 8
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+
+from langchain_core.documents import Document
+from pypdf import PdfReader
+
+CACHE_DIR = Path(os.getenv("PDF_TEXT_CACHE_DIR", Path(__file__).parent / "pdf_text_cache"))
+PAGES_PER_TASK = 16
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _page_labels(path):
+    # once per file: page_labels walks the whole label tree for every page
+    return PdfReader(path).page_labels
+
+
+def _extract_range(path, start: int, labels):
+    """
+    Pages start .. start + len(labels) of a PDF, labels being their slice of page_labels.
+    """
+    reader = PdfReader(path)
+    return [
+        {"page": i, "page_label": label, "text": reader.pages[i].extract_text()}
+        for i, label in enumerate(labels, start)
+    ]
+
+
+def extract_pages(paths, workers: int = None, use_cache: bool = True):
+    """
+    Yield (path, pages) for every PDF in sorted path order.
+
+    Up to `workers` files are in flight at a time, and each file is yielded
+    as soon as its pages are extracted, so memory holds only those files.
+    """
+    paths = iter(sorted(str(path) for path in paths))
+    workers = workers or os.cpu_count()
+    window = deque()
+
+    with ProcessPoolExecutor(workers) as pool:
+        def fill():
+            while len(window) < workers:
+                path = next(paths, None)
+                if path is None:
+                    return
+                cached = CACHE_DIR / f"{file_sha256(path)}.json"
+                if use_cache and cached.exists():
+                    window.append({"path": path, "cached": cached})
+                else:
+                    window.append({"path": path, "cached": cached, "labels": pool.submit(_page_labels, path)})
+
+        def schedule(entry):
+            # page ranges are queued once the file's labels are known
+            if "labels" in entry and "tasks" not in entry:
+                labels = entry["labels"].result()
+                entry["tasks"] = [
+                    pool.submit(_extract_range, entry["path"], start, labels[start:start + PAGES_PER_TASK])
+                    for start in range(0, len(labels), PAGES_PER_TASK)
+                ]
+
+        fill()
+        while window:
+            for entry in window:
+                schedule(entry)
+            entry = window.popleft()
+            if "tasks" in entry:
+                # tasks were submitted in start order, so this keeps page order
+                pages = [page for task in entry["tasks"] for page in task.result()]
+                if use_cache:
+                    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                    entry["cached"].write_text(json.dumps(pages))
+            else:
+                pages = json.loads(entry["cached"].read_text())
+            fill()
+            yield entry["path"], pages
+
+
+def load_corpus(directory, workers: int = None, use_cache: bool = True):
+    """
+    Yield one Document per page for every PDF under directory, like PyPDFLoader does.
+    """
+    paths = Path(directory).rglob("*.pdf")
+    for path, file_pages in extract_pages(paths, workers, use_cache):
+        for page in file_pages:
+            yield Document(
+                page_content=page["text"],
+                metadata={
+                    "source": path,
+                    "page": page["page"],
+                    "page_label": page["page_label"],
+                    "total_pages": len(file_pages),
+                },
+            )
+
+
+def main():
+    from dotenv import load_dotenv
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from embedding_cache import CachedEmbeddings
+    from vector_config import make_embeddings, get_or_create_vector_store
+    from ingest import ingest_documents
+    from sparse_index import BM25Index
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory")
+    parser.add_argument("--collection", default="nodejs_vector")
+    parser.add_argument("--url", default="http://vector-db:6333")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=400)
+    embeddings = CachedEmbeddings(make_embeddings())
+    vector_store = get_or_create_vector_store(
+        url=args.url,
+        collection_name=args.collection,
+        embedding=embeddings
+    )
+
+    ingest_documents(
+        load_corpus(args.directory, args.workers),
+        vector_store,
+        text_splitter,
+        sparse_index=BM25Index(args.collection),
+        on_batch=lambda pages, chunks: print(f"Indexed {chunks} chunks from {pages} pages")
+    )
+    print("Indexing of Documents Done...")
+
+
+if __name__ == "__main__":
+    main()
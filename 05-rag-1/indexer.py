@@ -0,0 +1,70 @@
+# Incremental re-indexing
+#
+# Every chunk gets a deterministic point ID from (source, start offset,
+# content hash). A run reads the IDs the collection actually holds, then only
+# embeds and upserts chunks that are new or changed and deletes every other
+# point, instead of rebuilding the collection and duplicating points under
+# fresh random IDs. Points from earlier runs with random IDs are deleted and a
+# wiped or recreated collection is filled again. Split with add_start_index=True.
+
+import os
+import uuid
+
+import xxhash
+from numpy_store import NumpyVectorStore
+
+BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+SCROLL_LIMIT = 1000
+ID_NAMESPACE = uuid.UUID("8a6f1c1e-4f0b-4c44-9d53-2f1f0f7c9a51")
+
+
+def chunk_id(chunk):
+    source = chunk.metadata.get("source", "")
+    offset = chunk.metadata.get("start_index", "")
+    digest = xxhash.xxh3_128_hexdigest(chunk.page_content.encode("utf-8", "surrogatepass"))
+    return str(uuid.uuid5(ID_NAMESPACE, f"{source}\0{offset}\0{digest}"))
+
+
+def stored_ids(vector_store):
+    """
+    IDs of every point in the store's collection.
+    """
+    if isinstance(vector_store, NumpyVectorStore):
+        return set(vector_store.ids)
+    if not vector_store.client.collection_exists(vector_store.collection_name):
+        return set()
+    ids, offset = set(), None
+    while True:
+        points, offset = vector_store.client.scroll(
+            vector_store.collection_name, limit=SCROLL_LIMIT, offset=offset, with_payload=False, with_vectors=False
+        )
+        ids.update(str(point.id) for point in points)
+        if offset is None:
+            return ids
+
+
+def sync_documents(chunks, vector_store, batch_size: int = BATCH_SIZE):
+    """
+    Make the collection hold exactly these chunks, touching only what changed.
+
+    Returns counts of added, deleted and unchanged chunks.
+    """
+    current = {}
+    for chunk in chunks:
+        current.setdefault(chunk_id(chunk), chunk)
+
+    indexed = stored_ids(vector_store)
+    added = [id_ for id_ in current if id_ not in indexed]
+    deleted = [id_ for id_ in indexed if id_ not in current]
+
+    for i in range(0, len(added), batch_size):
+        batch_ids = added[i:i + batch_size]
+        vector_store.add_documents([current[id_] for id_ in batch_ids], ids=batch_ids)
+    if deleted:
+        vector_store.delete(ids=deleted)
+
+    return {
+        "added": len(added),
+        "deleted": len(deleted),
+        "unchanged": len(current) - len(added),
+    }
@@ -0,0 +1,52 @@
+# Streaming PDF ingestion
+#
+# Pages come out of PyPDFLoader.lazy_load() one at a time and go through
+# splitting, embedding and upsert in fixed-size batches, so memory stays flat
+# for any PDF size and the first chunks are searchable while the rest of the
+# file is still being parsed. With a sparse_index (sparse_index.py) the
+# chunks are added to its BM25 postings too, which are written once at the end.
+
+import os
+
+from langchain_community.document_loaders import PyPDFLoader
+
+BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+
+
+def ingest_documents(documents, vector_store, text_splitter, batch_size: int = BATCH_SIZE, on_batch=None, sparse_index=None):
+    """
+    Split, embed and upsert an iterable of documents in batches.
+
+    on_batch(documents_seen, chunks_indexed) is called after every upsert.
+    Returns the number of chunks indexed.
+    """
+    batch = []
+    seen = 0
+    indexed = 0
+
+    def flush(chunks):
+        nonlocal indexed
+        ids = vector_store.add_documents(chunks)
+        if sparse_index is not None:
+            sparse_index.add(ids, [chunk.page_content for chunk in chunks])
+        indexed += len(chunks)
+        if on_batch:
+            on_batch(seen, indexed)
+
+    for document in documents:
+        seen += 1
+        batch.extend(text_splitter.split_documents([document]))
+        while len(batch) >= batch_size:
+            flush(batch[:batch_size])
+            batch = batch[batch_size:]
+
+    if batch:
+        flush(batch)
+    if sparse_index is not None:
+        sparse_index.save()
+    return indexed
+
+
+def ingest_pdf(path, vector_store, text_splitter, batch_size: int = BATCH_SIZE, on_batch=None, sparse_index=None):
+    loader = PyPDFLoader(file_path=path)
+    return ingest_documents(loader.lazy_load(), vector_store, text_splitter, batch_size, on_batch, sparse_index)
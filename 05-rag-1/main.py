@@ -1,38 +1,41 @@
 # indexing 
 
-from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from pathlib import Path
-from langchain_openai import OpenAIEmbeddings
 from dotenv import load_dotenv
-from langchain_qdrant import QdrantVectorStore
+from embedding_cache import CachedEmbeddings
+from vector_config import make_embeddings, get_or_create_vector_store
+from ingest import ingest_pdf
+from sparse_index import BM25Index
 
 load_dotenv()
 
 pdf_path = Path(__file__).parent / "nodejs.pdf"
 
-# Reading Docs
-loader = PyPDFLoader(file_path = pdf_path)
-docs = loader.load()
-
-print(docs[0])
 # Text splitting
 text_splitter = RecursiveCharacterTextSplitter(
     chunk_size=1000,
     chunk_overlap=400
 )
-# print(text_splitter)
-texts_split = text_splitter.split_documents(documents=docs)
 
 # # Vector embeddings
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+embeddings = CachedEmbeddings(make_embeddings())
 
-# # Using [embeddings] create embeddings of [texts_split] and store in DB
-vector_store = QdrantVectorStore.from_documents(
-    documents=texts_split,
+vector_store = get_or_create_vector_store(
     url="http://vector-db:6333",
     collection_name="nodejs_vector",
     embedding=embeddings
 )
 
+# Reading Docs page by page, each batch of chunks is embedded and stored right away
+# and added to the BM25 index of the same collection
+ingest_pdf(
+    pdf_path,
+    vector_store,
+    text_splitter,
+    on_batch=lambda pages, chunks: print(f"Indexed {chunks} chunks from {pages} pages"),
+    sparse_index=BM25Index("nodejs_vector"),
+)
+
+print(f"Embedding cache: {embeddings.hits} hits, {embeddings.misses} misses")
 print("Indexing of Documents Done...")
@@ -1,25 +1,34 @@
 # Retrieval 
 
-from langchain_openai import OpenAIEmbeddings
-from langchain_qdrant import QdrantVectorStore
 from openai import OpenAI
+from vector_config import make_embeddings, open_vector_store, search_params
 from dotenv import load_dotenv
+from context_packer import pack_context
+from sparse_index import BM25Index, INDEX_DIR, hybrid_search
+import os
 
 load_dotenv()
 
 client = OpenAI()
 
+SEARCH_K = int(os.getenv("SEARCH_K", "8"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+
 # Vector embeddings
-embeddings = OpenAIEmbeddings(
-    model="text-embedding-3-large"
-)
+embeddings = make_embeddings()
 
-vector_db = QdrantVectorStore.from_existing_collection(
+vector_db = open_vector_store(
     url="http://localhost:6333",
     collection_name="nodejs_vector",
     embedding=embeddings
 )
 
+# exact identifiers (CLI flags, API names, error codes) come from BM25;
+# collections indexed without it are searched dense only
+sparse_index = BM25Index.open("nodejs_vector")
+if sparse_index is None:
+    print(f"No BM25 index for nodejs_vector in {INDEX_DIR}, searching dense only")
+
 # input
 while True:
     query = input(">")
@@ -28,11 +37,19 @@ while True:
         print("Closing the chat")
         break
 
-    search_results = vector_db.similarity_search(
-        query=query
+    search_results = hybrid_search(
+        vector_db,
+        sparse_index,
+        query,
+        k=SEARCH_K,
+        search_params=search_params()
     )
 
-    context = "\n\n\n".join([f"Page Content: {result.page_content}\nPage Number: {result.metadata['page_label']}\nFile Location: {result.metadata['source']}" for result in search_results])
+    context = pack_context(
+        search_results,
+        CONTEXT_TOKEN_BUDGET,
+        lambda result, text: f"Page Content: {text}\nPage Number: {result.metadata['page_label']}\nFile Location: {result.metadata['source']}"
+    )
 
     SYSTEM_PROMPT = f"""
         You are a helpfull AI Assistant who answers user query based on the available context
@@ -0,0 +1,94 @@
+# pytest for the in-process vector store, no Qdrant server needed
+#
+#   cd 05-rag-1 && python -m pytest -q
+
+import numpy as np
+import pytest
+
+from numpy_store import NumpyVectorStore
+
+
+class FakeEmbeddings:
+    """
+    One axis per known word, so a query hits the texts that contain it.
+    """
+
+    WORDS = ["npm", "install", "stream", "buffer", "event"]
+
+    def embed_query(self, text):
+        words = text.split()
+        return [float(word in words) for word in self.WORDS]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return NumpyVectorStore(FakeEmbeddings(), "test", str(tmp_path))
+
+
+def search(store, query, k=1):
+    return [(doc.metadata["_id"], doc.page_content) for doc in store.similarity_search(query, k=k)]
+
+
+def test_add_and_search(store):
+    store.add_texts(["npm install", "stream buffer", "event"], ids=["a", "b", "c"])
+    store.add_texts(["buffer"], ids=["d"])
+
+    assert store.ids == ["a", "b", "c", "d"]
+    assert search(store, "npm") == [("a", "npm install")]
+    assert search(store, "buffer", k=2) == [("d", "buffer"), ("b", "stream buffer")]
+    doc, score = store.similarity_search_with_score("event", k=1)[0]
+    assert doc.metadata["_id"] == "c"
+    assert score == pytest.approx(1.0)
+
+
+def test_upsert_replaces_rows(store):
+    store.add_texts(["npm install", "stream"], ids=["a", "b"])
+    store.add_texts(["event", "buffer", "buffer stream"], ids=["a", "c", "c"])
+
+    assert sorted(store.ids) == ["a", "b", "c"]
+    assert search(store, "event") == [("a", "event")]
+    assert search(store, "npm") != [("a", "npm install")]
+    assert [doc.page_content for doc in store.get_by_ids(["c"])] == ["buffer stream"]
+
+
+def test_delete(store):
+    store.add_texts(["npm install", "stream", "event"], ids=["a", "b", "c"])
+    store.delete(["b", "missing"])
+
+    assert store.ids == ["a", "c"]
+    assert search(store, "stream", k=2)[0][0] != "b"
+    store.delete(["a", "c"])
+    assert store.ids == []
+    assert store.similarity_search("npm") == []
+
+
+def test_reopen_and_readers_keep_their_snapshot(store, tmp_path):
+    store.add_texts(["npm install", "stream", "event"], ids=["a", "b", "c"])
+    reader = NumpyVectorStore.from_existing_collection(FakeEmbeddings(), "test", str(tmp_path))
+    assert reader.ids == ["a", "b", "c"]
+
+    # the writer rewrites the files; the reader still maps the old ones
+    store.delete(["a"])
+    store.add_texts(["buffer"], ids=["b"])
+    assert search(reader, "npm") == [("a", "npm install")]
+    assert np.asarray(reader.vectors).shape == (3, 5)
+
+    reopened = NumpyVectorStore(FakeEmbeddings(), "test", str(tmp_path))
+    assert reopened.ids == ["c", "b"]
+    assert search(reopened, "buffer") == [("b", "buffer")]
+
+
+def test_query_vectors_are_not_modified(store):
+    store.add_texts(["npm install"], ids=["a"])
+    queries = np.array([[3.0, 4.0, 0.0, 0.0, 0.0]], dtype=np.float32)
+    store.similarity_search_with_score_by_vectors(queries, k=1)
+    assert queries.tolist() == [[3.0, 4.0, 0.0, 0.0, 0.0]]
+
+
+def test_dimension_mismatch(store):
+    store.add_texts(["npm"], ids=["a"])
+    with pytest.raises(ValueError):
+        store.add_vectors(["x"], [[1.0, 0.0]], ids=["b"])
@@ -1,20 +1,22 @@
 # Retrieval 
 
-from langchain_openai import OpenAIEmbeddings
-from langchain_qdrant import QdrantVectorStore
 from openai import OpenAI
+from vector_config import make_embeddings, open_vector_store, search_params
 from dotenv import load_dotenv
+from context_packer import pack_context
+import os
 
 load_dotenv()
 
 client = OpenAI()
 
+SEARCH_K = int(os.getenv("SEARCH_K", "8"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+
 # Vector embeddings
-embeddings = OpenAIEmbeddings(
-    model="text-embedding-3-large"
-)
+embeddings = make_embeddings()
 
-vector_db = QdrantVectorStore.from_existing_collection(
+vector_db = open_vector_store(
     url="http://vector-db:6333",
     collection_name="web_vector",
     embedding=embeddings
@@ -28,11 +30,17 @@ while True:
         print("Closing the chat")
         break
 
-    search_results = vector_db.similarity_search(
-        query=query
+    search_results = vector_db.similarity_search_with_score(
+        query=query,
+        k=SEARCH_K,
+        search_params=search_params()
     )
 
-    context = "\n\n\n".join([f"Page Content: {result.page_content}\nPage description: {result.metadata['description']}\nFile Location: {result.metadata['source']}" for result in search_results])
+    context = pack_context(
+        search_results,
+        CONTEXT_TOKEN_BUDGET,
+        lambda result, text: f"Page Content: {text}\nPage description: {result.metadata['description']}\nFile Location: {result.metadata['source']}"
+    )
 
     SYSTEM_PROMPT = f"""
         You are a helpfull AI Assistant who answers user query accurately based on the available context
@@ -1,10 +1,11 @@
 # indexing
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
 from langchain_community.document_loaders import WebBaseLoader
 from dotenv import load_dotenv
-from langchain_qdrant import QdrantVectorStore
+from embedding_cache import CachedEmbeddings
+from vector_config import make_embeddings, get_or_create_vector_store
+from indexer import sync_documents
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
@@ -35,22 +36,26 @@ docs = loader.load()
 # Text splitting
 text_splitter = RecursiveCharacterTextSplitter(
     chunk_size=1000,
-    chunk_overlap=400
+    chunk_overlap=400,
+    add_start_index=True
 )
 texts_split = text_splitter.split_documents(documents=docs)
 
 print(texts_split)
 
 # Vector embeddings
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+embeddings = CachedEmbeddings(make_embeddings())
 print("embeddings")
 
-# Using [embeddings] create embeddings of [texts_split] and store in DB
-vector_store = QdrantVectorStore.from_documents(
-    documents=texts_split,
+# Using [embeddings] embed only new or changed chunks of [texts_split] and store in DB
+vector_store = get_or_create_vector_store(
     url="http://vector-db:6333",
     collection_name="web_vector",
     embedding=embeddings
 )
+stats = sync_documents(texts_split, vector_store)
 
+print(f"Chunks added: {stats['added']}, deleted: {stats['deleted']}, unchanged: {stats['unchanged']}")
+
+print(f"Embedding cache: {embeddings.hits} hits, {embeddings.misses} misses")
 print("Indexing of Documents Done...")
\ No newline at end of file
@@ -1,5 +1,5 @@
 from redis import Redis
 from rq import Queue
 
-queue = Queue(connection = Redis(host = 'valkey'))
-
+redis = Redis(host = 'valkey')
+queue = Queue(connection = redis)
@@ -0,0 +1,66 @@
+# Context packing for retrieval prompts
+#
+# Chunks are split with chunk_overlap=400, so neighbouring hits from the same
+# page repeat a lot of text. Hits are taken best score first, the spans they
+# share with already picked chunks of the same page are cut off, and chunks
+# are added until the token budget is used up.
+
+# shared module in 01-Tokenization, on PYTHONPATH
+from token_counter import count_tokens
+
+MIN_OVERLAP = 20
+
+
+def _overlap(left: str, right: str, max_overlap: int):
+    """
+    Length of the longest suffix of left that is also a prefix of right.
+    """
+    for size in range(min(len(left), len(right), max_overlap), MIN_OVERLAP - 1, -1):
+        if left[-size:] == right[:size]:
+            return size
+    return 0
+
+
+def _page_key(doc):
+    return doc.metadata.get("source"), doc.metadata.get("page")
+
+
+def _trim(text: str, picked, max_overlap: int):
+    for other in picked:
+        if text in other:
+            return ""
+        text = text[_overlap(other, text, max_overlap):]
+        size = _overlap(text, other, max_overlap)
+        if size:
+            text = text[:-size]
+    return text.strip()
+
+
+def pack_context(hits, budget: int, format_hit, max_overlap: int = 400, separator: str = "\n\n\n"):
+    """
+    Build the prompt context from scored hits within a token budget.
+
+    hits is a list of (Document, score) pairs as returned by
+    similarity_search_with_score, format_hit(doc, text) renders one entry.
+    """
+    picked = {}
+    entries = []
+    used = 0
+    separator_tokens = count_tokens(separator)
+
+    for doc, score in sorted(hits, key=lambda hit: hit[1], reverse=True):
+        key = _page_key(doc)
+        text = _trim(doc.page_content, picked.get(key, []), max_overlap)
+        if not text:
+            continue
+
+        entry = format_hit(doc, text)
+        cost = count_tokens(entry) + (separator_tokens if entries else 0)
+        if used + cost > budget:
+            continue
+
+        picked.setdefault(key, []).append(doc.page_content)
+        entries.append(entry)
+        used += cost
+
+    return separator.join(entries)
@@ -0,0 +1,60 @@
+# Exact-match answer cache and single-flight dedup for /chat
+#
+# Queries are normalized (case, whitespace, trailing punctuation) and hashed.
+# A finished answer is kept in Valkey for RESULT_CACHE_TTL seconds and served
+# without touching the queue. While a query is queued or running, its job id
+# is held under an in-flight key, so identical requests attach to that job
+# instead of enqueueing a duplicate.
+
+import hashlib
+import os
+import re
+
+from .connection import redis
+
+RESULT_TTL = int(os.getenv("RESULT_CACHE_TTL", "3600"))
+# upper bound on how long a job can hold its in-flight slot
+INFLIGHT_TTL = int(os.getenv("INFLIGHT_TTL", "600"))
+
+# compare-and-delete in one step, so a slot claimed in between is never freed
+_release = redis.register_script(
+    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+)
+
+
+def normalize_query(query: str):
+    return re.sub(r"\s+", " ", query).strip().rstrip("?!. ").lower()
+
+
+def _key(kind: str, query: str):
+    digest = hashlib.sha256(normalize_query(query).encode()).hexdigest()
+    return f"rag:{kind}:{digest}"
+
+
+def get_answer(query: str):
+    answer = redis.get(_key("answer", query))
+    return answer.decode() if answer is not None else None
+
+
+def store_answer(query: str, answer: str):
+    redis.set(_key("answer", query), answer, ex=RESULT_TTL)
+
+
+def claim(query: str, job_id: str):
+    """
+    Try to register job_id as the one computing this query.
+
+    Returns the id of the job holding the query: job_id itself if the
+    claim succeeded, the job already in flight otherwise, or None if the
+    slot was freed in between.
+    """
+    key = _key("inflight", query)
+    if redis.set(key, job_id, nx=True, ex=INFLIGHT_TTL):
+        return job_id
+    current = redis.get(key)
+    return current.decode() if current is not None else None
+
+
+def release(query: str, job_id: str):
+    # only the job holding the slot may free it
+    _release(keys=[_key("inflight", query)], args=[job_id])
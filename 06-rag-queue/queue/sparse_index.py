@@ -0,0 +1,245 @@
+# BM25 sparse index and hybrid retrieval
+#
+# Dense search misses exact identifiers (CLI flags, API names, error codes)
+# that a lexical match finds right away. BM25Index keeps an inverted index
+# over the same chunks as the vector collection: every term's postings are
+# precomputed BM25 weights stored in contiguous numpy arrays that are
+# memory-mapped on open. Postings are sorted by weight, so a query reads at
+# most BM25_POSTINGS entries per term and costs the same few milliseconds on
+# any collection size.
+#
+# The index lives in <BM25_INDEX_DIR>/<name>/bm25, next to the collection in
+# VECTOR_STORE_DIR unless BM25_INDEX_DIR is set. The indexer and the
+# retrievers must share that directory: the dev container sets BM25_INDEX_DIR
+# for every app, and a retriever that finds no index searches dense only.
+#
+# Writes only append term counts to a log on disk; save() streams that log
+# once to rebuild the postings, so building never holds per-chunk term counts
+# in memory. hybrid_search / fuse_hits merge BM25 hits with the dense hits of
+# the vector store by weighted fusion of their min-max scaled scores.
+
+from array import array
+from collections import Counter
+from pathlib import Path
+import json
+import os
+import re
+import shutil
+import uuid
+
+import numpy as np
+from .numpy_store import STORE_DIR
+
+INDEX_DIR = os.getenv("BM25_INDEX_DIR", STORE_DIR)
+BM25_WEIGHT = float(os.getenv("BM25_WEIGHT", "0.5"))
+BM25_POSTINGS = int(os.getenv("BM25_POSTINGS", "2048"))
+K1 = 1.5
+B = 0.75
+
+WORD = re.compile(r"\w+(?:[.\-/:]\w+)*")
+PART = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str):
+    """
+    Lowercased words, keeping identifiers like fs.readFile or --save-dev whole
+    and also emitting their parts.
+    """
+    tokens = []
+    for word in WORD.findall(text.lower()):
+        tokens.append(word)
+        parts = PART.findall(word)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, collection_name: str, path: str = INDEX_DIR):
+        self.collection_name = collection_name
+        self.dir = Path(path) / collection_name / "bm25"
+        self._load()
+
+    def _load(self):
+        if not (self.dir / "ids.json").exists():
+            self.ids, self.vocab = [], {}
+            self.offsets = np.zeros(1, dtype=np.int64)
+            self.postings = np.empty(0, dtype=np.int32)
+            self.weights = np.empty(0, dtype=np.float32)
+            return
+        self.ids = json.loads((self.dir / "ids.json").read_text())
+        self.vocab = json.loads((self.dir / "vocab.json").read_text())
+        self.offsets = np.load(self.dir / "offsets.npy")
+        self.postings = np.load(self.dir / "postings.npy", mmap_mode="r")
+        self.weights = np.load(self.dir / "weights.npy", mmap_mode="r")
+
+    def _append(self, records):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.dir / "terms.jsonl", "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    def _records(self):
+        path = self.dir / "terms.jsonl"
+        if path.exists():
+            with open(path) as f:
+                for line in f:
+                    yield json.loads(line)
+
+    def add(self, ids, texts):
+        """
+        Add or replace chunks. Searches see them after save().
+        """
+        self._append({"id": str(id_), "terms": Counter(tokenize(text))} for id_, text in zip(ids, texts))
+
+    def delete(self, ids):
+        self._append({"id": str(id_), "terms": None} for id_ in ids)
+
+    def save(self):
+        """
+        Rebuild the postings from the term count log and write them to disk.
+        """
+        # the log keeps every write; only the last record of each id counts
+        latest = {}
+        for n, record in enumerate(self._records()):
+            latest[record["id"]] = n if record["terms"] is not None else None
+
+        ids, vocab = [], {}
+        # typed buffers: a Python object per posting would not fit 1M chunks in memory
+        terms, docs, tfs = array("i"), array("i"), array("f")
+        self.dir.mkdir(parents=True, exist_ok=True)
+        compacted = self.dir / "terms.jsonl.tmp"
+        with open(compacted, "w") as log:
+            for n, record in enumerate(self._records()):
+                if latest[record["id"]] != n:
+                    continue
+                row = len(ids)
+                ids.append(record["id"])
+                for term, tf in record["terms"].items():
+                    terms.append(vocab.setdefault(term, len(vocab)))
+                    docs.append(row)
+                    tfs.append(tf)
+                log.write(json.dumps(record) + "\n")
+        del latest
+
+        terms = np.frombuffer(terms, dtype=np.int32)
+        docs = np.frombuffer(docs, dtype=np.int32)
+        tfs = np.frombuffer(tfs, dtype=np.float32)
+        lengths = np.bincount(docs, weights=tfs, minlength=len(ids)).astype(np.float32)
+        df = np.bincount(terms, minlength=len(vocab))
+        # Okapi BM25 with the non-negative idf of Lucene
+        idf = np.log1p((len(ids) - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = K1 * (1 - B + B * lengths / max(lengths.mean(), 1.0)) if len(ids) else lengths
+        weights = idf[terms] * tfs * (K1 + 1) / (tfs + norm[docs])
+
+        # group postings by term, highest weight first
+        order = np.lexsort((-weights, terms))
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=offsets[1:])
+
+        self._replace("postings.npy", lambda f: np.save(f, docs[order]))
+        self._replace("weights.npy", lambda f: np.save(f, weights[order]))
+        self._replace("offsets.npy", lambda f: np.save(f, offsets))
+        self._replace("vocab.json", lambda f: f.write(json.dumps(vocab).encode()))
+        os.replace(compacted, self.dir / "terms.jsonl")
+        # written last: its presence marks a complete index
+        self._replace("ids.json", lambda f: f.write(json.dumps(ids).encode()))
+        self._load()
+
+    def _replace(self, name: str, write):
+        tmp_path = self.dir / f"{name}.tmp"
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, self.dir / name)
+
+    def search_many(self, queries, k: int = 4, postings: int = BM25_POSTINGS):
+        """
+        Top-k (id, score) pairs for each query.
+        """
+        results = []
+        for query in queries:
+            rows = [self.vocab[term] for term in set(tokenize(query)) if term in self.vocab]
+            if not rows:
+                results.append([])
+                continue
+            spans = [(self.offsets[row], min(self.offsets[row + 1], self.offsets[row] + postings)) for row in rows]
+            docs = np.concatenate([self.postings[start:end] for start, end in spans])
+            weights = np.concatenate([self.weights[start:end] for start, end in spans])
+
+            matched, inverse = np.unique(docs, return_inverse=True)
+            scores = np.bincount(inverse, weights=weights)
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            results.append([(self.ids[matched[i]], float(scores[i])) for i in top])
+        return results
+
+    def search(self, query: str, k: int = 4):
+        return self.search_many([query], k)[0]
+
+    @classmethod
+    def open(cls, collection_name: str, path: str = INDEX_DIR):
+        """
+        The collection's index, or None if it was indexed without one.
+        """
+        if not (Path(path) / collection_name / "bm25" / "ids.json").exists():
+            return None
+        return cls(collection_name, path)
+
+    @classmethod
+    def delete_collection(cls, collection_name: str, path: str = INDEX_DIR):
+        shutil.rmtree(Path(path) / collection_name / "bm25", ignore_errors=True)
+
+
+def _key(id_):
+    # Qdrant returns UUID point ids hyphenated, the index keeps them as given
+    try:
+        return uuid.UUID(str(id_)).hex
+    except ValueError:
+        return str(id_)
+
+
+def _scaled(hits):
+    if not hits:
+        return []
+    scores = [score for _, score in hits]
+    low, high = min(scores), max(scores)
+    if high == low:
+        return [1.0 for _ in scores]
+    return [(score - low) / (high - low) for score in scores]
+
+
+def fuse_hits(vector_store, index, queries, grouped_dense, k: int = 4, weight: float = BM25_WEIGHT):
+    """
+    Merge each query's dense (Document, score) hits with its BM25 hits.
+
+    Both lists are min-max scaled and combined as
+    (1 - weight) * dense + weight * bm25; chunks found only by BM25 are
+    fetched from the vector store. Returns top-k (Document, score) pairs per query.
+    """
+    grouped_sparse = index.search_many(queries, k)
+    known = {_key(doc.metadata["_id"]) for hits in grouped_dense for doc, _ in hits}
+    missing = list({id_ for hits in grouped_sparse for id_, _ in hits if _key(id_) not in known})
+    fetched = {_key(doc.metadata["_id"]): doc for doc in vector_store.get_by_ids(missing)} if missing else {}
+
+    results = []
+    for dense, sparse in zip(grouped_dense, grouped_sparse):
+        fused = {}
+        for (doc, _), score in zip(dense, _scaled(dense)):
+            fused[_key(doc.metadata["_id"])] = [doc, (1 - weight) * score]
+        for (id_, _), score in zip(sparse, _scaled(sparse)):
+            entry = fused.setdefault(_key(id_), [fetched.get(_key(id_)), 0.0])
+            entry[1] += weight * score
+        # ids the vector store no longer holds are dropped
+        ranked = sorted((entry for entry in fused.values() if entry[0] is not None), key=lambda entry: entry[1], reverse=True)
+        results.append([(doc, score) for doc, score in ranked[:k]])
+    return results
+
+
+def hybrid_search(vector_store, index, query: str, k: int = 4, search_params=None):
+    """
+    Top-k (Document, score) pairs from dense and BM25 search; dense only if index is None.
+    """
+    dense = vector_store.similarity_search_with_score(query=query, k=k, search_params=search_params)
+    if index is None:
+        return dense
+    return fuse_hits(vector_store, index, [query], [dense], k)[0]
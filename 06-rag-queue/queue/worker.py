@@ -1,27 +1,56 @@
-from langchain_openai import OpenAIEmbeddings
-from langchain_qdrant import QdrantVectorStore
 from openai import OpenAI
+from rq import get_current_job
+from .vector_config import make_embeddings, open_vector_store, search_params
+from .context_packer import pack_context
+from .sparse_index import BM25Index, INDEX_DIR, hybrid_search
+from .result_cache import store_answer, release
+import os
 
 client = OpenAI()
 
+SEARCH_K = int(os.getenv("SEARCH_K", "8"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+
 # Vector embeddings
-embeddings = OpenAIEmbeddings(
-    model="text-embedding-3-large",
-)
+embeddings = make_embeddings()
 
-vector_db = QdrantVectorStore.from_existing_collection(
+vector_db = open_vector_store(
     url="http://vector-db:6333",
     collection_name="nodejs_vector",
     embedding=embeddings
 )
 
+# exact identifiers (CLI flags, API names, error codes) come from BM25;
+# collections indexed without it are searched dense only
+sparse_index = BM25Index.open("nodejs_vector")
+if sparse_index is None:
+    print(f"No BM25 index for nodejs_vector in {INDEX_DIR}, searching dense only")
+
 def process_query(query: str):
+    job = get_current_job()
+    try:
+        answer = answer_query(query)
+        store_answer(query, answer)
+        return answer
+    finally:
+        if job is not None:
+            release(query, job.id)
+
+def answer_query(query: str):
     print("user query", query)
-    search_results = vector_db.similarity_search(
-        query=query
+    search_results = hybrid_search(
+        vector_db,
+        sparse_index,
+        query,
+        k=SEARCH_K,
+        search_params=search_params()
     )
 
-    context = "\n\n\n".join([f"Page Content: {result.page_content}\nPage Number: {result.metadata['page_label']}\nFile Location: {result.metadata['source']}" for result in search_results])
+    context = pack_context(
+        search_results,
+        CONTEXT_TOKEN_BUDGET,
+        lambda result, text: f"Page Content: {text}\nPage Number: {result.metadata['page_label']}\nFile Location: {result.metadata['source']}"
+    )
 
     SYSTEM_PROMPT = f"""
         You are a helpfull AI Assistant who answers user query based on the available context
@@ -43,4 +72,6 @@ def process_query(query: str):
     )
 
 
-    print(f"🤖: {chat_completion.choices[0].message.content}")
\ No newline at end of file
+    answer = chat_completion.choices[0].message.content
+    print(f"🤖: {answer}")
+    return answer
@@ -1,6 +1,8 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, HTTPException, Query
 from .queue.connection import queue
+from .queue.result_cache import get_answer, claim, release
 from .queue.worker import process_query
+import uuid
 
 app = FastAPI()
 
@@ -12,5 +14,48 @@ def chat():
 def chat(
     query: str = Query(..., description = "Chat message")
 ):
-    job = queue.enqueue(process_query, query)
-    return { 'status': 'queued', 'job_id': job.id }
\ No newline at end of file
+    answer = get_answer(query)
+    if answer is not None:
+        return { 'status': 'done', 'answer': answer, 'cached': True }
+
+    for _ in range(3):
+        job_id = uuid.uuid4().hex
+        holder = claim(query, job_id)
+        if holder == job_id:
+            # the previous job may have stored its answer just before releasing
+            answer = get_answer(query)
+            if answer is not None:
+                release(query, job_id)
+                return { 'status': 'done', 'answer': answer, 'cached': True }
+            try:
+                job = queue.enqueue(process_query, query, job_id = job_id)
+            except Exception:
+                # otherwise identical queries would attach to a job that never existed
+                release(query, job_id)
+                raise
+            return { 'status': 'queued', 'job_id': job.id }
+
+        if holder is not None:
+            # an identical query is already queued or running: attach to it.
+            # No job yet means its request claimed the slot and is still enqueueing.
+            job = queue.fetch_job(holder)
+            if job is None or not (job.is_failed or job.is_finished):
+                return { 'status': 'queued', 'job_id': holder, 'deduplicated': True }
+            # the holder ended without releasing its slot
+            release(query, holder)
+
+        answer = get_answer(query)
+        if answer is not None:
+            return { 'status': 'done', 'answer': answer, 'cached': True }
+
+    # the slot kept changing hands; enqueueing without it would duplicate the work
+    raise HTTPException(status_code = 503, detail = "Query is being recomputed, try again")
+
+@app.get('/job-status')
+def job_status(
+    job_id: str = Query(..., description = "Job ID returned by /chat")
+):
+    job = queue.fetch_job(job_id)
+    if job is None:
+        return { 'status': 'not_found', 'job_id': job_id }
+    return { 'status': job.get_status(), 'job_id': job_id, 'answer': job.return_value() }
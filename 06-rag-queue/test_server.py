@@ -0,0 +1,142 @@
+# pytest for /chat dedup against an in-memory Valkey (fakeredis)
+#
+#   cd 06-rag-queue && python -m pytest -q
+#
+# The app is a package with relative imports whose folder name is not a
+# valid module name, so it is imported here as rag_queue. The worker module
+# is replaced: it opens the Qdrant collection at import time.
+
+from pathlib import Path
+import importlib
+import sys
+import types
+
+import fakeredis
+import pytest
+from fastapi.testclient import TestClient
+from rq import Queue
+
+APP_DIR = Path(__file__).parent
+
+
+def process_query(query: str):
+    return f"answer to {query}"
+
+
+@pytest.fixture
+def app():
+    redis = fakeredis.FakeRedis()
+    package = types.ModuleType("rag_queue")
+    package.__path__ = [str(APP_DIR)]
+    queue_package = types.ModuleType("rag_queue.queue")
+    queue_package.__path__ = [str(APP_DIR / "queue")]
+    connection = types.ModuleType("rag_queue.queue.connection")
+    connection.redis = redis
+    connection.queue = Queue(connection=redis)
+    worker = types.ModuleType("rag_queue.queue.worker")
+    # RQ refuses functions defined in __main__ or a test module it cannot import
+    process_query.__module__ = "rag_queue.queue.worker"
+    worker.process_query = process_query
+
+    modules = {
+        "rag_queue": package,
+        "rag_queue.queue": queue_package,
+        "rag_queue.queue.connection": connection,
+        "rag_queue.queue.worker": worker,
+    }
+    saved = {name: sys.modules.get(name) for name in [*modules, "rag_queue.queue.result_cache", "rag_queue.server"]}
+    sys.modules.update(modules)
+    sys.modules.pop("rag_queue.queue.result_cache", None)
+    sys.modules.pop("rag_queue.server", None)
+    try:
+        server = importlib.import_module("rag_queue.server")
+        result_cache = importlib.import_module("rag_queue.queue.result_cache")
+        yield server, result_cache, connection.queue
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
+def test_identical_queries_share_one_job(app):
+    server, _, queue = app
+    client = TestClient(server.app)
+
+    first = client.post("/chat", params={"query": "What is a stream?"}).json()
+    second = client.post("/chat", params={"query": "what is a  stream"}).json()
+
+    assert first["status"] == "queued"
+    assert second == {"status": "queued", "job_id": first["job_id"], "deduplicated": True}
+    assert len(queue.job_ids) == 1
+
+
+def test_cached_answer_skips_the_queue(app):
+    server, result_cache, queue = app
+    result_cache.store_answer("What is a stream?", "a sequence of chunks")
+
+    response = TestClient(server.app).post("/chat", params={"query": "what is a stream"}).json()
+
+    assert response == {"status": "done", "answer": "a sequence of chunks", "cached": True}
+    assert len(queue.job_ids) == 0
+
+
+def test_query_arriving_between_claim_and_enqueue_attaches(app):
+    server, _, queue = app
+    client = TestClient(server.app)
+    enqueue = queue.enqueue
+    during = []
+
+    def slow_enqueue(*args, **kwargs):
+        if not during:
+            during.append(client.post("/chat", params={"query": "hello"}).json())
+        return enqueue(*args, **kwargs)
+
+    queue.enqueue = slow_enqueue
+    first = client.post("/chat", params={"query": "Hello?"}).json()
+
+    assert during[0]["job_id"] == first["job_id"]
+    assert during[0]["deduplicated"] is True
+    assert len(queue.job_ids) == 1
+
+
+def test_failed_enqueue_releases_the_slot(app):
+    server, result_cache, queue = app
+    client = TestClient(server.app, raise_server_exceptions=False)
+    enqueue = queue.enqueue
+
+    def broken_enqueue(*args, **kwargs):
+        raise ConnectionError("valkey went away")
+
+    queue.enqueue = broken_enqueue
+    assert client.post("/chat", params={"query": "hello"}).status_code == 500
+    assert result_cache.redis.get(result_cache._key("inflight", "hello")) is None
+
+    queue.enqueue = enqueue
+    retry = client.post("/chat", params={"query": "hello"}).json()
+    assert retry["status"] == "queued"
+    assert "deduplicated" not in retry
+
+
+def test_finished_holder_is_released(app):
+    server, result_cache, queue = app
+    client = TestClient(server.app)
+
+    job_id = client.post("/chat", params={"query": "hello"}).json()["job_id"]
+    queue.fetch_job(job_id).set_status("finished")
+
+    retry = client.post("/chat", params={"query": "hello"}).json()
+    assert retry["status"] == "queued"
+    assert retry["job_id"] != job_id
+
+
+def test_release_only_frees_its_own_slot(app):
+    _, result_cache, _ = app
+    assert result_cache.claim("hello", "job-a") == "job-a"
+
+    result_cache.release("hello", "job-b")
+    assert result_cache.claim("hello", "job-c") == "job-a"
+
+    result_cache.release("hello", "job-a")
+    assert result_cache.claim("hello", "job-c") == "job-c"
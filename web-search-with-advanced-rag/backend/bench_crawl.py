@@ -0,0 +1,97 @@
+# Crawl benchmark against a local test site: RecursiveUrlLoader vs Crawler.
+# The site has a sitemap.xml, pages link to each other and every response
+# is delayed to stand in for network latency.
+#
+#   python bench_crawl.py --pages 200 --latency 0.05 --depth 3
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+import argparse
+import asyncio
+import time
+
+from crawler import Crawler
+
+
+def test_site(pages: int, latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            host = f"http://{self.headers['Host']}"
+            if self.path == "/sitemap.xml":
+                locs = "".join(f"<url><loc>{host}/docs/page-{i}</loc></url>" for i in range(pages))
+                body = f'<?xml version="1.0"?><urlset>{locs}</urlset>'
+                content_type = "application/xml"
+            elif self.path == "/docs/" or self.path.startswith("/docs/page-"):
+                current = int(self.path.rsplit("-", 1)[1]) if "page-" in self.path else 0
+                links = "".join(
+                    f'<a href="/docs/page-{(current * 4 + j) % pages}#top">next</a>' for j in range(1, 5)
+                )
+                body = (
+                    f"<html lang='en'><head><title>Page {current}</title></head>"
+                    f"<body><nav>{links}</nav><main><p>{'Lorem ipsum ' * 200}</p></main></body></html>"
+                )
+                content_type = "text/html; charset=utf-8"
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            payload = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run_crawler(base_url: str, depth: int, max_per_host: int, use_sitemap: bool = True):
+    crawler = Crawler(base_url, max_depth=depth, max_per_host=max_per_host, use_sitemap=use_sitemap)
+    first = None
+    start = time.perf_counter()
+    count = 0
+    async for _ in crawler.crawl():
+        count += 1
+        first = first or time.perf_counter() - start
+    return count, time.perf_counter() - start, first
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--depth", type=int, default=3)
+    args = parser.parse_args()
+
+    server = test_site(args.pages, args.latency)
+    base_url = f"http://127.0.0.1:{server.server_port}/docs/"
+
+    try:
+        from langchain_community.document_loaders import RecursiveUrlLoader
+
+        start = time.perf_counter()
+        docs = RecursiveUrlLoader(base_url, max_depth=args.depth).load()
+        print(f"{'RecursiveUrlLoader':28} {len(docs):5} pages {time.perf_counter() - start:8.2f} s")
+    except ImportError:
+        pass
+
+    runs = [(8, False, "links only"), (1, True, "sitemap"), (4, True, "sitemap"), (16, True, "sitemap")]
+    for max_per_host, use_sitemap, label in runs:
+        count, total, first = asyncio.run(run_crawler(base_url, args.depth, max_per_host, use_sitemap))
+        print(
+            f"{f'Crawler, {max_per_host}/host, {label}':28} {count:5} pages {total:8.2f} s"
+            f"  first page after {first * 1000:.0f} ms"
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# Async site crawler
+#
+# Replacement for RecursiveUrlLoader, which fetches one page at a time.
+# Pages are fetched concurrently over one pooled httpx client with a cap and
+# a minimum delay per host, URLs are canonicalized and deduplicated, the
+# site's sitemap.xml seeds the frontier, and documents are yielded as soon
+# as they arrive. Like RecursiveUrlLoader, only URLs under base_url are
+# followed (also after redirects) and depth 0 is base_url itself. Failed
+# fetches and malformed links are counted in errors and never stop a worker.
+
+from collections import defaultdict
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+import asyncio
+import html
+import os
+import re
+import time
+
+import httpx
+from langchain_core.documents import Document
+
+MAX_PER_HOST = int(os.getenv("CRAWL_MAX_PER_HOST", "8"))
+HOST_DELAY = float(os.getenv("CRAWL_HOST_DELAY", "0"))
+TIMEOUT = float(os.getenv("CRAWL_TIMEOUT", "20"))
+USER_AGENT = "gen-ai-docs-crawler/1.0"
+MAX_SITEMAPS = 50
+
+HREF_RE = re.compile(r"""<a\s[^>]*?href\s*=\s*["']([^"'#>]+)""", re.IGNORECASE)
+LOC_RE = re.compile(r"<loc>\s*([^<\s]+)\s*</loc>", re.IGNORECASE)
+TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+DESCRIPTION_RE = re.compile(
+    r"""<meta\s[^>]*name\s*=\s*["']description["'][^>]*content\s*=\s*["']([^"']*)""", re.IGNORECASE
+)
+LANG_RE = re.compile(r"""<html\s[^>]*lang\s*=\s*["']([^"']+)""", re.IGNORECASE)
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize(url: str, base: str = None):
+    """
+    Absolute URL without fragment, default port or tracking params, with a lowercase host.
+    """
+    if base:
+        url = urljoin(base, url)
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode([
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_")
+    ])
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def _metadata(url: str, page: str):
+    metadata = {"source": url}
+    if match := TITLE_RE.search(page):
+        metadata["title"] = html.unescape(match.group(1).strip())
+    if match := DESCRIPTION_RE.search(page):
+        metadata["description"] = html.unescape(match.group(1).strip())
+    else:
+        metadata["description"] = "No description found."
+    if match := LANG_RE.search(page):
+        metadata["language"] = match.group(1)
+    return metadata
+
+
+class Crawler:
+    def __init__(
+        self,
+        base_url: str,
+        max_depth: int = 2,
+        max_pages: int = None,
+        max_per_host: int = MAX_PER_HOST,
+        host_delay: float = HOST_DELAY,
+        use_sitemap: bool = True,
+    ):
+        self.base_url = canonicalize(base_url)
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.max_per_host = max_per_host
+        self.host_delay = host_delay
+        self.use_sitemap = use_sitemap
+
+        self.seen = set()
+        self.pages = 0
+        self.errors = 0
+        self._frontier = asyncio.Queue()
+        self._host_slots = defaultdict(lambda: asyncio.Semaphore(self.max_per_host))
+        self._host_locks = defaultdict(asyncio.Lock)
+        self._host_last = defaultdict(float)
+
+    def _in_scope(self, url: str):
+        return url.startswith(self.base_url) and url.startswith(("http://", "https://"))
+
+    def _enqueue_link(self, href: str, page_url: str, depth: int):
+        try:
+            url = canonicalize(html.unescape(href), page_url)
+        except ValueError:
+            # malformed href, e.g. a bad port or an unclosed IPv6 bracket
+            self.errors += 1
+            return
+        self._enqueue(url, depth)
+
+    def _enqueue(self, url: str, depth: int):
+        if url in self.seen or not self._in_scope(url):
+            return
+        if self.max_pages and len(self.seen) >= self.max_pages:
+            return
+        self.seen.add(url)
+        self._frontier.put_nowait((url, depth))
+
+    async def _get(self, client, url: str):
+        host = urlsplit(url).netloc
+        async with self._host_slots[host]:
+            if self.host_delay:
+                # space out request starts per host
+                async with self._host_locks[host]:
+                    wait = self._host_last[host] + self.host_delay - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    self._host_last[host] = time.monotonic()
+            return await client.get(url)
+
+    async def _seed_from_sitemap(self, client):
+        parts = urlsplit(self.base_url)
+        pending = [f"{parts.scheme}://{parts.netloc}/sitemap.xml"]
+        fetched = 0
+        while pending and fetched < MAX_SITEMAPS:
+            sitemap_url = pending.pop()
+            fetched += 1
+            try:
+                response = await self._get(client, sitemap_url)
+            except (httpx.HTTPError, ValueError):
+                continue
+            if response.status_code != 200:
+                continue
+            is_index = "<sitemapindex" in response.text
+            for loc in LOC_RE.findall(response.text):
+                if is_index:
+                    pending.append(html.unescape(loc))
+                elif self.max_depth > 1:
+                    # treat sitemap entries as one hop from the start page
+                    self._enqueue_link(loc, sitemap_url, 1)
+
+    async def _worker(self, client, out):
+        while True:
+            url, depth = await self._frontier.get()
+            try:
+                response = await self._get(client, url)
+                content_type = response.headers.get("content-type", "")
+                if response.status_code != 200 or "html" not in content_type:
+                    continue
+
+                final_url = canonicalize(str(response.url))
+                if final_url != url:
+                    # a redirect left the site or landed on a page we already have
+                    if final_url in self.seen or not self._in_scope(final_url):
+                        continue
+                    self.seen.add(final_url)
+
+                page = response.text
+                self.pages += 1
+                await out.put(Document(page_content=page, metadata=_metadata(final_url, page)))
+
+                if depth + 1 < self.max_depth:
+                    for href in HREF_RE.findall(page):
+                        self._enqueue_link(href, final_url, depth + 1)
+            except Exception:
+                # a dead worker would leave the frontier undrained and crawl() hanging
+                self.errors += 1
+            finally:
+                self._frontier.task_done()
+
+    async def crawl(self, client: httpx.AsyncClient = None):
+        """
+        Async generator of raw HTML documents, in the order they are fetched.
+        """
+        own_client = client is None
+        if own_client:
+            client = httpx.AsyncClient(
+                headers={"User-Agent": USER_AGENT},
+                follow_redirects=True,
+                timeout=TIMEOUT,
+                limits=httpx.Limits(max_connections=self.max_per_host * 4, max_keepalive_connections=self.max_per_host * 4),
+            )
+
+        out = asyncio.Queue()
+        workers = []
+        try:
+            self._enqueue(self.base_url, 0)
+            if self.use_sitemap:
+                await self._seed_from_sitemap(client)
+
+            workers = [asyncio.create_task(self._worker(client, out)) for _ in range(self.max_per_host)]
+
+            async def finish():
+                await self._frontier.join()
+                await out.put(None)
+
+            workers.append(asyncio.create_task(finish()))
+            while (doc := await out.get()) is not None:
+                yield doc
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if own_client:
+                await client.aclose()
+
+
+async def crawl_documents(base_url: str, max_depth: int = 2, **kwargs):
+    return [doc async for doc in Crawler(base_url, max_depth, **kwargs).crawl()]
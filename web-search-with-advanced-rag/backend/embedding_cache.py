@@ -0,0 +1,133 @@
+# Persistent embedding cache
+#
+# Wraps any LangChain embeddings object. Vectors are stored in a local SQLite
+# file keyed by (model, dimensions, xxh3 hash of the text), as float16 by
+# default, so re-indexing unchanged content makes no embedding API calls.
+# The least recently used vectors are evicted once the store outgrows its size limit.
+# The stored size is summed once on open and then tracked per write, so a store
+# is not followed by a scan of the whole table.
+
+from pathlib import Path
+from threading import Lock
+import asyncio
+import os
+import sqlite3
+import time
+
+import numpy as np
+import xxhash
+from langchain_core.embeddings import Embeddings
+
+CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", str(Path(__file__).parent / "embedding_cache.sqlite3"))
+CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024"))
+CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float16")
+# sqlite limits the number of bound parameters per statement
+LOOKUP_CHUNK = 500
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings, path: str = CACHE_PATH, max_mb: int = CACHE_MAX_MB, dtype: str = CACHE_DTYPE):
+        self.embeddings = embeddings
+        self.max_bytes = max_mb * 1024 * 1024
+        self.dtype = np.dtype(dtype)
+        self.namespace = f"{getattr(embeddings, 'model', type(embeddings).__name__)}:{getattr(embeddings, 'dimensions', None)}\0".encode()
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key BLOB PRIMARY KEY, vector BLOB NOT NULL, dtype TEXT NOT NULL, used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings (used)")
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def _key(self, text: str):
+        return xxhash.xxh3_128_digest(self.namespace + text.encode("utf-8", "surrogatepass"))
+
+    def _lookup(self, keys):
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[i:i + LOOKUP_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                rows = self._db.execute(
+                    f"SELECT key, vector, dtype FROM embeddings WHERE key IN ({marks})", chunk
+                ).fetchall()
+                for key, vector, dtype in rows:
+                    found[key] = np.frombuffer(vector, dtype=dtype).astype(np.float32).tolist()
+                if rows:
+                    self._db.execute(
+                        f"UPDATE embeddings SET used = ? WHERE key IN ({marks})", [time.time(), *chunk]
+                    )
+        return found
+
+    def _store(self, keys, vectors):
+        now = time.time()
+        rows = [
+            (key, np.asarray(vector, dtype=self.dtype).tobytes(), self.dtype.name, now)
+            for key, vector in zip(keys, vectors)
+        ]
+        with self._lock:
+            # rows being replaced give back their old size
+            for i in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[i:i + LOOKUP_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                self._bytes -= self._db.execute(
+                    f"SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings WHERE key IN ({marks})", chunk
+                ).fetchone()[0]
+            self._db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._bytes += sum(len(row[1]) for row in rows)
+            self._evict()
+
+    def _evict(self):
+        if self._bytes <= self.max_bytes:
+            return
+        # drop the oldest entries until we're back at 90% of the limit
+        target = self._bytes - int(0.9 * self.max_bytes)
+        evicted, freed = [], 0
+        for key, size in self._db.execute("SELECT key, LENGTH(vector) FROM embeddings ORDER BY used"):
+            if freed >= target:
+                break
+            evicted.append(key)
+            freed += size
+        for i in range(0, len(evicted), LOOKUP_CHUNK):
+            chunk = evicted[i:i + LOOKUP_CHUNK]
+            self._db.execute(f"DELETE FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+        self._bytes -= freed
+
+    def _split(self, texts):
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(list(set(keys)))
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return keys, found, missing
+
+    def embed_documents(self, texts):
+        keys, found, missing = self._split(texts)
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            self._store(list(missing), vectors)
+            found.update(zip(missing, vectors))
+        return [found[key] for key in keys]
+
+    async def aembed_documents(self, texts):
+        # sqlite reads and writes stay off the event loop
+        keys, found, missing = await asyncio.to_thread(self._split, texts)
+        if missing:
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            await asyncio.to_thread(self._store, list(missing), vectors)
+            found.update(zip(missing, vectors))
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str):
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str):
+        return (await self.aembed_documents([text]))[0]
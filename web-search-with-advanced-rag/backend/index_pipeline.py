@@ -0,0 +1,203 @@
+# Staged indexing pipeline for /index-stream
+#
+# crawl -> extract -> split -> batch -> embed -> upsert, connected by bounded
+# asyncio queues so every stage works on whatever is ready instead of
+# waiting for the previous stage to finish. Each stage has its own number of
+# workers; total time approaches that of the slowest stage. All upserts go
+# through the one client of the vector store passed in. A sparse_index
+# (sparse_index.py) gets every upserted chunk and is saved when all stages finish.
+
+from dataclasses import dataclass
+import asyncio
+import os
+import time
+
+from langchain_core.documents import Document
+from html_extract import extract_text, get_pool
+from token_counter import count_tokens
+from vector_config import add_embedded_documents
+
+QUEUE_SIZE = int(os.getenv("INDEX_QUEUE_SIZE", "64"))
+EMBED_BATCH_SIZE = int(os.getenv("INDEX_EMBED_BATCH_SIZE", "40"))
+PARALLELISM = {
+    "extract": int(os.getenv("INDEX_EXTRACT_WORKERS", "4")),
+    "split": int(os.getenv("INDEX_SPLIT_WORKERS", "2")),
+    "embed": int(os.getenv("INDEX_EMBED_WORKERS", "4")),
+    "upsert": int(os.getenv("INDEX_UPSERT_WORKERS", "2")),
+}
+
+DONE = object()
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    # set when the stage gets its first item, so waiting on upstream stages
+    # does not count against its throughput
+    started: float = None
+    finished: float = None
+
+    def start(self):
+        if self.started is None:
+            self.started = time.perf_counter()
+
+    def as_dict(self):
+        if self.started is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self.finished or time.perf_counter()) - self.started
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "seconds": round(elapsed, 2),
+            "per_second": round(self.items / elapsed, 2) if elapsed else 0.0,
+        }
+
+
+class IndexPipeline:
+    def __init__(
+        self,
+        crawler,
+        text_splitter,
+        embeddings,
+        vector_store,
+        extractor=extract_text,
+        parallelism: dict = None,
+        queue_size: int = QUEUE_SIZE,
+        embed_batch_size: int = EMBED_BATCH_SIZE,
+        sparse_index=None,
+    ):
+        self.crawler = crawler
+        self.text_splitter = text_splitter
+        self.embeddings = embeddings
+        self.vector_store = vector_store
+        self.extractor = extractor
+        self.parallelism = {**PARALLELISM, **(parallelism or {})}
+        self.queue_size = queue_size
+        self.embed_batch_size = embed_batch_size
+        self.sparse_index = sparse_index
+
+        self.stats = {
+            name: StageStats(name) for name in ["crawl", "extract", "split", "embed", "upsert"]
+        }
+        self.sections = []
+        self.bytes_in = 0
+        self.tokens_out = 0
+        self._events = asyncio.Queue()
+
+    def _emit(self, event: str, data):
+        self._events.put_nowait((event, data))
+
+    def stage_stats(self):
+        return [stats.as_dict() for stats in self.stats.values()]
+
+    async def _stage(self, name: str, inbox, outbox, handle, workers: int):
+        """
+        Run handle(item) on workers tasks, forwarding every returned item downstream.
+        """
+        stats = self.stats[name]
+
+        async def worker():
+            while True:
+                item = await inbox.get()
+                if item is DONE:
+                    # let the other workers of this stage see it too
+                    await inbox.put(DONE)
+                    return
+                stats.start()
+                for result in await handle(item):
+                    await outbox.put(result)
+                stats.items += 1
+
+        async with asyncio.TaskGroup() as group:
+            for _ in range(workers):
+                group.create_task(worker())
+        stats.finished = time.perf_counter()
+        await outbox.put(DONE)
+
+    async def _crawl(self, outbox):
+        stats = self.stats["crawl"]
+        stats.start()
+        async for doc in self.crawler.crawl():
+            stats.items += 1
+            self.sections.append({
+                "title": doc.metadata.get("title", "Untitled"),
+                "source": doc.metadata.get("source", "Unknown"),
+            })
+            self._emit("page", {"url": doc.metadata["source"], "loaded": stats.items})
+            await outbox.put(doc)
+        stats.finished = time.perf_counter()
+        await outbox.put(DONE)
+
+    async def _extract(self, doc):
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(get_pool(), self.extractor, doc.page_content)
+        self.bytes_in += len(doc.page_content.encode())
+        if not text.strip():
+            return []
+        self.tokens_out += await asyncio.to_thread(count_tokens, text)
+        return [Document(page_content=text, metadata=doc.metadata)]
+
+    async def _split(self, doc):
+        return [await asyncio.to_thread(self.text_splitter.split_documents, [doc])]
+
+    async def _batch(self, inbox, outbox):
+        batch = []
+        while (chunks := await inbox.get()) is not DONE:
+            batch.extend(chunks)
+            while len(batch) >= self.embed_batch_size:
+                await outbox.put(batch[:self.embed_batch_size])
+                batch = batch[self.embed_batch_size:]
+        if batch:
+            await outbox.put(batch)
+        await outbox.put(DONE)
+
+    async def _embed(self, batch):
+        vectors = await self.embeddings.aembed_documents([chunk.page_content for chunk in batch])
+        return [(batch, vectors)]
+
+    async def _upsert(self, item):
+        batch, vectors = item
+        ids = await asyncio.to_thread(add_embedded_documents, self.vector_store, batch, vectors)
+        if self.sparse_index is not None:
+            await asyncio.to_thread(self.sparse_index.add, ids, [chunk.page_content for chunk in batch])
+        self._emit("progress", self.stage_stats())
+        return []
+
+    async def _run_stages(self):
+        queues = [asyncio.Queue(self.queue_size) for _ in range(6)]
+        to_extract, to_split, to_batch, to_embed, to_upsert, sink = queues
+        workers = self.parallelism
+        try:
+            # a failing stage cancels all the others
+            async with asyncio.TaskGroup() as group:
+                group.create_task(self._crawl(to_extract))
+                group.create_task(self._stage("extract", to_extract, to_split, self._extract, workers["extract"]))
+                group.create_task(self._stage("split", to_split, to_batch, self._split, workers["split"]))
+                group.create_task(self._batch(to_batch, to_embed))
+                group.create_task(self._stage("embed", to_embed, to_upsert, self._embed, workers["embed"]))
+                group.create_task(self._stage("upsert", to_upsert, sink, self._upsert, workers["upsert"]))
+            if self.sparse_index is not None:
+                await asyncio.to_thread(self.sparse_index.save)
+        finally:
+            self._events.put_nowait(None)
+
+    async def run(self):
+        """
+        Run the pipeline, yielding (event, data) progress pairs as stages make progress.
+        """
+        task = asyncio.create_task(self._run_stages())
+        try:
+            while (event := await self._events.get()) is not None:
+                yield event
+            try:
+                await task
+            except ExceptionGroup as group:
+                # surface the stage failure itself rather than the task group wrapper
+                error = group
+                while isinstance(error, ExceptionGroup):
+                    error = error.exceptions[0]
+                raise error from group
+        finally:
+            task.cancel()
@@ -1,6 +1,4 @@
 
-from langchain_openai import OpenAIEmbeddings
-from langchain_qdrant import QdrantVectorStore
 from dotenv import load_dotenv
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, START, END
@@ -10,31 +8,138 @@ from typing import Annotated
 from typing import Annotated
 from langgraph.graph.message import add_messages
 from langchain.chat_models import init_chat_model
+from langchain_core.messages import AIMessage
+from pydantic import BaseModel, Field
 from persona import HITESH_REWRITER_SYSTEM_PROMPT
+from token_counter import trim_history
+from prompts import build_messages, ainvoke_llm
+from vector_config import make_embeddings, search_params
+from vector_registry import registry
+from multi_search import asearch_many, reciprocal_rank_fusion
+from sparse_index import fuse_hits
+import asyncio
 import os
+import time
 
 # nodes
 # state, graph, invoke and compile
 # 1. query enhancer
 # 2. Answer generation
 # 3. LLM as a judge -> output 
+# or, with mode="fused": 2. one answer from the RRF-fused hits of all sub-queries
+# or, with mode="adaptive": 0. retrieve for the original query first and pick
+#    the cheapest path its scores allow (direct answer, fused or best-of)
+# every retrieval merges dense hits with BM25 hits when the collection has a
+# sparse index (sparse_index.py)
 
 load_dotenv()
 
 class State(TypedDict):
     collection_name: str
+    mode: str
+    path: str
+    probe_hits: list
     user_query: str
     sub_queries: list
     result: str
     temp_result: list
+    branch_timings: list
     messages: Annotated[list, add_messages]
 
-embeddings = OpenAIEmbeddings(
-    model="text-embedding-3-large"
-)
-llm = init_chat_model(model_provider="openai", model="gpt-4.1-nano")
+class AnswerSelection(BaseModel):
+    scores: list[int] = Field(description="Score from 0 to 10 for each answer, in the order given")
+    best: int = Field(description="Number of the best answer, or 0 if no answer addresses the query")
+
+NO_ANSWER = "I'm sorry, none of the provided answers contain information to answer this query."
+
+embeddings = make_embeddings()
+# stream_usage keeps token usage (incl. cached tokens) on streamed responses
+llm = init_chat_model(model_provider="openai", model="gpt-4.1-nano", stream_usage=True)
+# answer judge: returns an AnswerSelection, with the raw message kept for usage stats
+judge = llm.with_structured_output(AnswerSelection, method="json_schema", include_raw=True)
+
+INDEX_NOT_FOUND = "Index not found. Please run the indexing step before asking questions."
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+# sub-queries retrieved and answered at the same time
+ANSWER_CONCURRENCY = int(os.getenv("ANSWER_CONCURRENCY", "4"))
+# documents kept from the reciprocal rank fusion in fused mode
+FUSED_CONTEXT_DOCS = int(os.getenv("FUSED_CONTEXT_DOCS", "8"))
+# adaptive mode: answer straight from the original query's hits when the top
+# score reaches EARLY_EXIT_SCORE and leads the k-th hit by EARLY_EXIT_MARGIN,
+# expand into a single fused answer above FUSED_SCORE, fan out fully below it
+PROBE_K = int(os.getenv("PROBE_K", "4"))
+EARLY_EXIT_SCORE = float(os.getenv("EARLY_EXIT_SCORE", "0.65"))
+EARLY_EXIT_MARGIN = float(os.getenv("EARLY_EXIT_MARGIN", "0.05"))
+FUSED_SCORE = float(os.getenv("FUSED_SCORE", "0.45"))
+
+async def with_bm25(vector_db, collection_name: str, queries, grouped_hits, k: int = 4):
+    """
+    Dense hits per query merged with the collection's BM25 hits, if it has an index.
+    """
+    index = await registry.aget_sparse(collection_name)
+    if index is None:
+        return grouped_hits
+    return await asyncio.to_thread(fuse_hits, vector_db, index, queries, grouped_hits, k)
 
-def generate_sub_queries(state: State):
+async def search_sub_queries(state: State, vector_db, queries):
+    """
+    Dense hits for each query. The original query (sub_queries[0]) reuses the
+    hits the adaptive probe already retrieved instead of being searched again.
+    """
+    probe_hits = state.get("probe_hits")
+    if probe_hits is not None and queries and queries[0] == state['user_query']:
+        rest = await asearch_many(vector_db, queries[1:], registry.async_client, search_params=search_params())
+        return [probe_hits, *rest]
+    return await asearch_many(vector_db, queries, registry.async_client, search_params=search_params())
+
+def choose_path(scores):
+    """
+    direct, fused or best-of for the original query's top-k similarity scores.
+    """
+    if not scores:
+        return "best-of"
+    top = scores[0]
+    if top >= EARLY_EXIT_SCORE and top - scores[-1] >= EARLY_EXIT_MARGIN:
+        return "direct"
+    if top >= FUSED_SCORE:
+        return "fused"
+    return "best-of"
+
+async def answer_if_confident(state: State):
+    """
+    Adaptive mode: retrieve for the original query only. If its hits are
+    strong and clear, answer from them right away (one retrieval, one
+    completion); otherwise record how far the query has to be expanded.
+    """
+    try:
+        vector_db = await registry.aget(state['collection_name'], embeddings)
+    except (UnexpectedResponse, FileNotFoundError):
+        state["result"] = INDEX_NOT_FOUND
+        state["path"] = "direct"
+        return state
+
+    hits = (await asearch_many(
+        vector_db, [state['user_query']], registry.async_client, k=PROBE_K, search_params=search_params()
+    ))[0]
+    scores = [round(score, 4) for _, score in hits]
+    state["path"] = choose_path(scores)
+    # kept for the fused and best-of paths, which retrieve for the original query too
+    state["probe_hits"] = hits
+    print(f"answer_if_confident: top-{PROBE_K} scores {scores} -> {state['path']} path")
+    if state["path"] != "direct":
+        return state
+
+    # the path is chosen on dense scores, the answer also gets exact-term matches
+    hits = (await with_bm25(vector_db, state['collection_name'], [state['user_query']], [hits], k=PROBE_K))[0]
+    response = await ainvoke_llm(llm, "answer_if_confident", build_messages(
+        ANSWER_SYSTEM_PROMPT, state['user_query'], context=answer_context([doc for doc, _ in hits])
+    ))
+    state["result"] = response.content.strip()
+    state["messages"] = [response]
+    return state
+
+async def generate_sub_queries(state: State):
     """
     Generate 3 sub-queries from the original query using few-shot prompting.
     """
@@ -72,11 +177,12 @@ Sub-Queries:
 
     query = state['user_query']
 
-    response = llm.invoke([
-        *state["messages"][-10:],
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": query}
-    ])
+    # static few-shot prompt first so its prefix is cached across turns
+    response = await ainvoke_llm(llm, "generate_sub_queries", build_messages(
+        SYSTEM_PROMPT,
+        query,
+        history=trim_history(state["messages"][-10:], HISTORY_TOKEN_BUDGET),
+    ))
 
     content = response.content.strip()
 
@@ -90,144 +196,213 @@ Sub-Queries:
     print(state['sub_queries'])
     return state
 
-def generate_answers(state: State):
-    state['temp_result'] = []
-    enhanced_queries = state['sub_queries']
-    # Initialize the vector DB only when needed
-    try:
-        vector_db = QdrantVectorStore.from_existing_collection(
-            url=os.getenv("QDRANT_URL"),
-            api_key=os.getenv("QDRANT_API_KEY"),
-            collection_name=state['collection_name'],
-            embedding=embeddings
-        )
-    except UnexpectedResponse:
-        state["result"] = "Index not found. Please run the indexing step before asking questions."
-        return state
-    for enhanced_query in enhanced_queries:
-        search_results = vector_db.similarity_search(
-            query=enhanced_query
-        )
+ANSWER_SYSTEM_PROMPT = """
+    You are a helpful AI assistant designed to answer user questions **strictly based on the context provided below**, which has been retrieved from webpages using recursive web loading.
+
+    **Important Rules:**
+    - You must not use any outside knowledge beyond what is included in the context.
+    - If the answer is present in the context, answer clearly, citing the relevant *Url*.
+    - If the answer is **not** available in the context, simply respond with:
+
+        **"I'm sorry, there is no information available in the provided context to answer that question."**
 
-        context = "\n\n\n".join([
-        f"Page Content: {result.page_content}\n\nPage Description: {result.metadata['description']}\n\nUrl: {result.metadata['source']}"
-        for result in search_results
-        ])
+    - Do **not** suggest referring to external sources, or websites unless the context explicitly mentions them.
+    - Do **not** fabricate urls, page titles, or suggest next steps.
+    - Do **not** ask follow-up questions or clarify anything.
+    - Stick exactly to what's in the context.
 
-        SYSTEM_PROMPT = f"""
-        You are a helpful AI assistant designed to answer user questions **strictly based on the context provided below**, which has been retrieved from webpages using recursive web loading.
+    **Formatting Instructions (for web display):**
+    - Use Markdown formatting:
+        - **Bold** for headings and important statements.
+        - *Italics* for emphasis.
+        - Bullet points or numbered lists for clarity.
+        - Code blocks for commands or examples.
 
-        **Important Rules:**
-        - You must not use any outside knowledge beyond what is included in the context.
-        - If the answer is present in the context, answer clearly, citing the relevant *Url*.
-        - If the answer is **not** available in the context, simply respond with:
+    **Example Style Guide:**
+    - **Headings:** Bold
+    - *Keywords or important terms:* Italic
+    - Code snippets: Code blocks (```)
+    """
 
-            **"I'm sorry, there is no information available in the provided context to answer that question."**
+def answer_context(search_results):
+    """
+    Retrieved documents as the context block that follows the static answer prompt.
+    """
+    context = "\n\n\n".join([
+    f"Page Content: {result.page_content}\n\nPage Description: {result.metadata['description']}\n\nUrl: {result.metadata['source']}"
+    for result in search_results
+    ])
+    return f"**Context for Answering the User’s Query:**\n\n{context}"
 
-        - Do **not** suggest referring to external sources, or websites unless the context explicitly mentions them.
-        - Do **not** fabricate urls, page titles, or suggest next steps.
-        - Do **not** ask follow-up questions or clarify anything.
-        - Stick exactly to what's in the context.
+async def answer_sub_query(enhanced_query: str, search_results):
+    """
+    Answer one sub-query from its retrieved documents. Returns (answer, timings).
+    """
+    started = time.perf_counter()
+    response = await ainvoke_llm(llm, "generate_answers", build_messages(
+        ANSWER_SYSTEM_PROMPT, enhanced_query, context=answer_context(search_results)
+    ))
 
-        **Formatting Instructions (for web display):**
-        - Use Markdown formatting:
-            - **Bold** for headings and important statements.
-            - *Italics* for emphasis.
-            - Bullet points or numbered lists for clarity.
-            - Code blocks for commands or examples.
+    content = response.content.strip()
+    finished = time.perf_counter()
 
-        **Example Style Guide:**
-        - **Headings:** Bold
-        - *Keywords or important terms:* Italic
-        - Code snippets: Code blocks (```)
+    timings = {
+        "query": enhanced_query,
+        "answer_ms": round((finished - started) * 1000),
+    }
+    return content, timings
 
-        **Context for Answering the User’s Query:**
+async def generate_answers(state: State):
+    state['temp_result'] = []
+    enhanced_queries = state['sub_queries']
+    # Reuse the shared client and cached store for this collection
+    try:
+        vector_db = await registry.aget(state['collection_name'], embeddings)
+    except (UnexpectedResponse, FileNotFoundError):
+        state["result"] = INDEX_NOT_FOUND
+        return state
+
+    # all sub-queries in one embeddings request and one batch search
+    started = time.perf_counter()
+    grouped_hits = await search_sub_queries(state, vector_db, enhanced_queries)
+    grouped_hits = await with_bm25(vector_db, state['collection_name'], enhanced_queries, grouped_hits)
+    retrieve_ms = round((time.perf_counter() - started) * 1000)
+    grouped_results = [[doc for doc, _ in hits] for hits in grouped_hits]
 
-        {context}
-        """
+    # one branch per sub-query; gather() keeps the answers in sub-query order
+    limit = asyncio.Semaphore(ANSWER_CONCURRENCY)
 
-        response = llm.invoke([
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": enhanced_query}
-        ])
+    async def branch(enhanced_query, search_results):
+        async with limit:
+            return await answer_sub_query(enhanced_query, search_results)
 
-        content = response.content.strip()
+    branches = await asyncio.gather(*map(branch, enhanced_queries, grouped_results))
 
-        state['temp_result'].append(content)
+    state['temp_result'] = [content for content, _ in branches]
+    state['branch_timings'] = [{**timings, "retrieve_ms": retrieve_ms} for _, timings in branches]
+    print(f"generate_answers: {len(branches)} branches in {time.perf_counter() - started:.2f} s")
     return state
 
-def select_best_answer(state: State):
+async def select_best_answer(state: State):
     """
     Given a user query and a list of top retrieved answers,
-    use the LLM to select the best answer as the answer.
+    use the LLM to score them and pick the best one by number.
 
-    Returns a formatted string with the selected answer or a fallback message.
+    The judge only returns scores and an index through structured output;
+    the selected text is taken from temp_result, so the answer is not
+    generated a second time.
     """
     BEST_RESULT_SYSTEM_PROMPT = """
         You are an expert AI assistant tasked with selecting the best information answer to answer the user's query.
 
         **Your task:**
         - Carefully read the user query and each retrieved answer.
-        - Select the answer that most directly, completely, and accurately answers the query.
+        - Score every answer from 0 to 10 on how directly, completely, and accurately it answers the query.
         - The best answer should be the one that is most specific and comprehensive.
-        - If none of the answers sufficiently address the question, respond:
-        **"I'm sorry, none of the provided answers contain information to answer this query."**
+        - If none of the answers sufficiently address the question, set best to 0.
 
         **Rules:**
         - Do NOT use any outside knowledge.
         - Select based strictly on the provided answers.
-        - **ONLY return the text of the best answer exactly as it is given**.
-        - Do NOT add, remove explanation or formatting 
-        - Just remove the Ans n. text and give everything as it is.
-        - Include source link everytime
+        - **ONLY** return the scores and the number of the best answer.
     """
 
+    if not state['temp_result']:
+        content = state.get("result") or NO_ANSWER
+        return {"messages": [AIMessage(content=content)], "result": content}
+
     temp_result = ''
     for i, text in enumerate(state['temp_result'], 1):
         temp_result += f"\n\nAns {i}. {text}"
-    print(temp_result)
     user_query = state['user_query']
     
-    messages = [
-        {"role": "system", "content": BEST_RESULT_SYSTEM_PROMPT},
-        {
-            "role": "user",
-            "content": f"User Query:\n{user_query}\n\nRetrieved answers:\n\n{temp_result}",
-        },
-    ]
+    messages = build_messages(
+        BEST_RESULT_SYSTEM_PROMPT,
+        f"User Query:\n{user_query}\n\nRetrieved answers:\n\n{temp_result}",
+    )
+
+    response = await ainvoke_llm(judge, "select_best_answer", messages)
+    selection = response["parsed"]
+    if selection is None:
+        # unparseable verdict: fall back to the answer to the original query
+        content = state['temp_result'][0]
+    elif 1 <= selection.best <= len(state['temp_result']):
+        print(f"select_best_answer: scores {selection.scores}, best {selection.best}")
+        content = state['temp_result'][selection.best - 1]
+    else:
+        content = NO_ANSWER
+
+    return {"messages": [AIMessage(content=content)], "result": content}
+
+async def answer_from_fused_context(state: State):
+    """
+    Fused mode: merge the hits of all sub-queries with reciprocal rank
+    fusion and answer the original query once from the fused context.
+    """
+    try:
+        vector_db = await registry.aget(state['collection_name'], embeddings)
+    except (UnexpectedResponse, FileNotFoundError):
+        state["result"] = INDEX_NOT_FOUND
+        return state
 
-    response = llm.invoke(messages)
+    grouped_hits = await search_sub_queries(state, vector_db, state['sub_queries'])
+    grouped_hits = await with_bm25(vector_db, state['collection_name'], state['sub_queries'], grouped_hits)
+    fused = reciprocal_rank_fusion(grouped_hits, limit=FUSED_CONTEXT_DOCS)
+    print(f"answer_from_fused_context: {sum(map(len, grouped_hits))} hits fused into {len(fused)}")
 
-    content = response.content.strip()
+    response = await ainvoke_llm(llm, "answer_from_fused_context", build_messages(
+        ANSWER_SYSTEM_PROMPT, state['user_query'], context=answer_context([doc for doc, _ in fused])
+    ))
+
+    return {"messages": [response], "result": response.content.strip()}
 
-    return {"messages": [response], "result": content}
+def route_start(state: State):
+    return "answer_if_confident" if state.get("mode") == "adaptive" else "generate_sub_queries"
 
-def answer_like_hitesh_sir(state: State):
+def route_after_probe(state: State):
+    return "answer_like_hitesh_sir" if state["path"] == "direct" else "generate_sub_queries"
+
+def route_by_mode(state: State):
+    path = state["path"] if state.get("mode") == "adaptive" else state.get("mode")
+    return "answer_from_fused_context" if path == "fused" else "generate_answers"
+
+async def answer_like_hitesh_sir(state: State):
     SYSTEM_PROMPT = HITESH_REWRITER_SYSTEM_PROMPT
 
     factual_answer = state["result"]
+    if factual_answer == INDEX_NOT_FOUND:
+        # passed through as is, so callers can tell it apart (and skip caching it)
+        return state
 
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": f"Factual Answer:\n{factual_answer}"},
-    ]
+    messages = build_messages(SYSTEM_PROMPT, f"Factual Answer:\n{factual_answer}")
 
-    response = llm.invoke(messages)
+    response = await ainvoke_llm(llm, "answer_like_hitesh_sir", messages)
     state["result"] = response.content.strip()
 
     return state
 
+# nodes whose LLM output is streamed to the client token by token
+STREAMED_NODES = {"answer_if_confident", "answer_from_fused_context", "answer_like_hitesh_sir"}
+
 graph_builder = StateGraph(State)
 
+graph_builder.add_node("answer_if_confident", answer_if_confident)
 graph_builder.add_node("generate_sub_queries", generate_sub_queries)
 graph_builder.add_node("generate_answers", generate_answers)
 graph_builder.add_node("select_best_answer", select_best_answer)
+graph_builder.add_node("answer_from_fused_context", answer_from_fused_context)
 graph_builder.add_node("answer_like_hitesh_sir", answer_like_hitesh_sir)
 
-graph_builder.add_edge(START, "generate_sub_queries")
-graph_builder.add_edge("generate_sub_queries", "generate_answers")
+graph_builder.add_conditional_edges(START, route_start, ["answer_if_confident", "generate_sub_queries"])
+graph_builder.add_conditional_edges(
+    "answer_if_confident", route_after_probe, ["answer_like_hitesh_sir", "generate_sub_queries"]
+)
+graph_builder.add_conditional_edges(
+    "generate_sub_queries", route_by_mode, ["generate_answers", "answer_from_fused_context"]
+)
 graph_builder.add_edge("generate_answers", "select_best_answer")
 graph_builder.add_edge("select_best_answer", "answer_like_hitesh_sir")
+graph_builder.add_edge("answer_from_fused_context", "answer_like_hitesh_sir")
 graph_builder.add_edge("answer_like_hitesh_sir", END)
 
 def compile_graph_with_checkpointer(checkpointer):
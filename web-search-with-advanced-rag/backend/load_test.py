@@ -0,0 +1,176 @@
+# Concurrency load test for /ask-stream
+#
+# Opens N concurrent SSE streams per level and reports completed streams,
+# time to first token and total time. Run the server with the semantic cache
+# out of the way so every request goes through the graph:
+#
+#   SEMANTIC_CACHE_THRESHOLD=2 uvicorn server:app --workers 1
+#   python load_test.py --url http://localhost:8000 --collection web_vector_... --levels 10,50,100,200
+#
+# --in-process runs the compiled graph directly with a fake LLM and fake
+# vector store of fixed latency (no server, no API calls), which shows how
+# many questions one event loop carries at once:
+#
+#   python load_test.py --in-process --latency 0.5 --levels 50,200,500
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import httpx
+
+QUESTIONS = [
+    "How do I get started?",
+    "What are the main concepts?",
+    "How do I configure authentication?",
+    "How do I deploy to production?",
+    "What does the API return on errors?",
+]
+
+
+def percentile(values, q: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def ask_over_http(client, url: str, collection: str, query: str, mode: str):
+    started = time.perf_counter()
+    first_token = None
+    params = {"query": query, "collection_name": collection, "mode": mode}
+    async with client.stream("GET", f"{url}/ask-stream", params=params) as response:
+        response.raise_for_status()
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+                if event == "token" and first_token is None:
+                    first_token = time.perf_counter() - started
+                elif event == "done":
+                    break
+    return first_token, time.perf_counter() - started
+
+
+def in_process_asker(latency: float):
+    os.environ.setdefault("OPENAI_API_KEY", "load-test")
+    from types import SimpleNamespace
+    from langchain_core.documents import Document
+    from langchain_core.messages import AIMessage
+    from langgraph.checkpoint.memory import MemorySaver
+    import langgraph_pipeline
+
+    class FakeLLM:
+        async def ainvoke(self, messages):
+            await asyncio.sleep(latency)
+            return AIMessage(content="1. first\n2. second\n3. third")
+
+    class FakeEmbeddings:
+        async def aembed_documents(self, texts):
+            await asyncio.sleep(latency / 10)
+            return [[1.0, 0.0] for _ in texts]
+
+    class FakeStore:
+        embeddings = FakeEmbeddings()
+
+        def similarity_search_with_score_by_vectors(self, vectors, k: int = 4):
+            doc = Document(page_content="text", metadata={"_id": 1, "description": "", "source": "http://example.com"})
+            return [[(doc, 1.0)] for _ in vectors]
+
+    async def aget(collection_name, embedding):
+        return FakeStore()
+
+    async def aget_sparse(collection_name):
+        return None
+
+    class FakeJudge:
+        async def ainvoke(self, messages):
+            await asyncio.sleep(latency)
+            selection = langgraph_pipeline.AnswerSelection(scores=[10, 5, 5, 5], best=1)
+            return {"raw": AIMessage(content=selection.model_dump_json()), "parsed": selection}
+
+    langgraph_pipeline.llm = FakeLLM()
+    langgraph_pipeline.judge = FakeJudge()
+    langgraph_pipeline.registry = SimpleNamespace(aget=aget, aget_sparse=aget_sparse, async_client=None)
+    graph = langgraph_pipeline.compile_graph_with_checkpointer(MemorySaver())
+
+    async def ask(i: int, query: str, mode: str):
+        started = time.perf_counter()
+        state = {
+            "collection_name": "load-test",
+            "mode": mode,
+            "path": None,
+            "probe_hits": None,
+            "user_query": query,
+            "result": None,
+            "sub_queries": [],
+            "temp_result": [],
+            "messages": [{"role": "user", "content": query}],
+        }
+        config = {"configurable": {"thread_id": f"load-test-{i}"}}
+        async for _ in graph.astream(state, config):
+            pass
+        return None, time.perf_counter() - started
+
+    return ask
+
+
+async def run_level(concurrency: int, ask):
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(ask(i, QUESTIONS[i % len(QUESTIONS)]) for i in range(concurrency)), return_exceptions=True
+    )
+    wall = time.perf_counter() - started
+
+    ok = [result for result in results if not isinstance(result, BaseException)]
+    errors = [result for result in results if isinstance(result, BaseException)]
+    ttft = [first for first, _ in ok if first is not None]
+    totals = [total for _, total in ok]
+    return {
+        "concurrency": concurrency,
+        "ok": len(ok),
+        "errors": len(errors),
+        "first_error": repr(errors[0]) if errors else None,
+        "wall_s": round(wall, 2),
+        "ttft_p50_s": round(statistics.median(ttft), 2) if ttft else None,
+        "total_p50_s": round(statistics.median(totals), 2) if totals else None,
+        "total_p95_s": round(percentile(totals, 0.95), 2) if totals else None,
+        "questions_per_s": round(len(ok) / wall, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--collection", default="")
+    parser.add_argument("--mode", default="adaptive", choices=["adaptive", "best-of", "fused"])
+    parser.add_argument("--levels", default="10,50,100,200")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--in-process", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM latency for --in-process")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.levels.split(",")]
+    client = None
+    if args.in_process:
+        in_process = in_process_asker(args.latency)
+        ask = lambda i, query: in_process(i, query, args.mode)
+    else:
+        client = httpx.AsyncClient(
+            timeout=args.timeout, limits=httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+        )
+        ask = lambda i, query: ask_over_http(client, args.url, args.collection, query, args.mode)
+
+    try:
+        for concurrency in levels:
+            print(json.dumps(await run_level(concurrency, ask)))
+    finally:
+        if client is not None:
+            await client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,252 @@
+# In-process vector store for small collections
+#
+# Same similarity_search / add_documents interface as QdrantVectorStore, but
+# the vectors live in one contiguous float32 file that is memory-mapped, and
+# a search is a single matrix-vector product plus argpartition. Good for a
+# single PDF or a test run without a Qdrant server.
+#
+# Adds append to the current vectors and docs files. Upserts and deletes
+# write a new pair of files and then swap manifest.json to point at them, so
+# a reader that still maps the old pair (this process or another) keeps a
+# consistent view. Each load is one (ids, docs, rows, vectors) snapshot, and
+# a search reads a single snapshot.
+
+from pathlib import Path
+from threading import Lock
+from typing import NamedTuple
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+STORE_DIR = os.getenv("VECTOR_STORE_DIR", str(Path(__file__).parent / "vector_store"))
+
+
+class Snapshot(NamedTuple):
+    ids: list
+    docs: list
+    rows: dict
+    vectors: np.ndarray
+
+
+EMPTY = Snapshot([], [], {}, np.empty((0, 0), dtype=np.float32))
+
+
+class NumpyVectorStore(VectorStore):
+    def __init__(self, embedding, collection_name: str, path: str = STORE_DIR):
+        self.embedding = embedding
+        self.collection_name = collection_name
+        self.dir = Path(path) / collection_name
+        self.manifest_path = self.dir / "manifest.json"
+        self._lock = Lock()
+        self._load()
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    @property
+    def ids(self):
+        return self._data.ids
+
+    @property
+    def docs(self):
+        return self._data.docs
+
+    @property
+    def rows(self):
+        return self._data.rows
+
+    @property
+    def vectors(self):
+        return self._data.vectors
+
+    def _files(self):
+        """
+        Current (vectors, docs, dim) of the collection.
+        """
+        if not self.manifest_path.exists():
+            # collections written before the manifest
+            return self.dir / "vectors.f32", self.dir / "docs.jsonl", None
+        manifest = json.loads(self.manifest_path.read_text())
+        return self.dir / manifest["vectors"], self.dir / manifest["docs"], manifest["dim"]
+
+    def _load(self):
+        # a rewrite in another process can remove the files between reading
+        # the manifest and opening them; the new manifest is then in place
+        for _ in range(3):
+            try:
+                self._data = self._read(*self._files())
+                return
+            except FileNotFoundError:
+                continue
+        self._data = self._read(*self._files())
+
+    def _read(self, vectors_path, docs_path, dim):
+        if not docs_path.exists():
+            return EMPTY
+        ids, docs = [], []
+        with open(docs_path) as f:
+            for line in f:
+                # a row still being appended by another process
+                if not line.endswith("\n"):
+                    break
+                row = json.loads(line)
+                ids.append(row["id"])
+                docs.append(row)
+        if not ids:
+            return EMPTY
+        # vectors are appended before their rows, so the file holds at least len(ids) rows
+        dim = dim or os.path.getsize(vectors_path) // 4 // len(ids)
+        vectors = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(len(ids), dim))
+        return Snapshot(ids, docs, {id_: i for i, id_ in enumerate(ids)}, vectors)
+
+    def _append(self, vectors, rows):
+        vectors_path, docs_path, _ = self._files()
+        if not docs_path.exists():
+            self._rewrite(vectors, rows)
+            return
+        with open(vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(docs_path, "a") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+        self._load()
+
+    def _rewrite(self, vectors, rows):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        old = self._files()[:2]
+        generation = uuid.uuid4().hex
+        manifest = {"vectors": f"vectors-{generation}.f32", "docs": f"docs-{generation}.jsonl", "dim": int(vectors.shape[1])}
+        with open(self.dir / manifest["vectors"], "wb") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(self.dir / manifest["docs"], "w") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+        tmp_path = self.dir / "manifest.json.tmp"
+        tmp_path.write_text(json.dumps(manifest))
+        os.replace(tmp_path, self.manifest_path)
+        self._load()
+        # open maps keep the old files' data until they are dropped
+        for path in old:
+            path.unlink(missing_ok=True)
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.add_vectors(texts, self.embedding.embed_documents(texts), metadatas, ids)
+
+    def add_vectors(self, texts, vectors, metadatas=None, ids=None):
+        """
+        Store texts whose embeddings were already computed.
+        """
+        metadatas = metadatas or [{} for _ in texts]
+        ids = [str(i) for i in ids] if ids else [uuid.uuid4().hex for _ in texts]
+        # an id given twice in one call keeps its last text
+        latest = sorted({id_: i for i, id_ in enumerate(ids)}.values())
+        if len(latest) < len(ids):
+            texts, vectors, metadatas, ids = ([values[i] for i in latest] for values in (texts, vectors, metadatas, ids))
+
+        vectors = np.array(vectors, dtype=np.float32)
+        # store unit vectors so the dot product is the cosine similarity
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        if len(self.ids) and vectors.shape[1] != self.vectors.shape[1]:
+            raise ValueError(f"Collection {self.collection_name} stores {self.vectors.shape[1]}-d vectors, got {vectors.shape[1]}")
+
+        rows = [
+            {"id": id_, "page_content": text, "metadata": metadata}
+            for id_, text, metadata in zip(ids, texts, metadatas)
+        ]
+        with self._lock:
+            data = self._data
+            if any(id_ in data.rows for id_ in ids):
+                # re-adding an id replaces its row, like an upsert in Qdrant
+                replaced = set(ids)
+                keep = [i for i, id_ in enumerate(data.ids) if id_ not in replaced]
+                if keep:
+                    vectors = np.concatenate([data.vectors[keep], vectors])
+                self._rewrite(vectors, [data.docs[i] for i in keep] + rows)
+            else:
+                self._append(vectors, rows)
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        drop = set(str(i) for i in ids or [])
+        with self._lock:
+            data = self._data
+            keep = [i for i, id_ in enumerate(data.ids) if id_ not in drop]
+            if len(keep) < len(data.ids):
+                vectors = data.vectors[keep] if keep else np.empty((0, data.vectors.shape[1]), dtype=np.float32)
+                self._rewrite(vectors, [data.docs[i] for i in keep])
+        return True
+
+    def _document(self, data: Snapshot, index: int):
+        row = data.docs[index]
+        return Document(
+            page_content=row["page_content"],
+            metadata={**row["metadata"], "_id": row["id"], "_collection_name": self.collection_name},
+        )
+
+    def get_by_ids(self, ids, /):
+        data = self._data
+        return [self._document(data, data.rows[str(id_)]) for id_ in ids if str(id_) in data.rows]
+
+    def search_by_matrix(self, queries, k: int = 4):
+        """
+        Top-k (Document, score) pairs for each row of a query matrix.
+        """
+        data = self._data
+        if not data.ids:
+            return [[] for _ in range(len(queries))]
+        # a copy: the caller's embeddings must not be normalized in place
+        queries = np.array(queries, dtype=np.float32)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+        scores = queries @ data.vectors.T
+        k = min(k, len(data.ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(scores, top):
+            order = candidates[np.argsort(-row[candidates])]
+            results.append([(self._document(data, int(i)), float(row[i])) for i in order])
+        return results
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4, **kwargs):
+        return self.search_by_matrix([embedding], k)[0]
+
+    def similarity_search_with_score_by_vectors(self, embeddings, k: int = 4):
+        """
+        Top-k (Document, score) pairs for each of several query vectors.
+        """
+        return self.search_by_matrix(embeddings, k)
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs):
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, collection_name: str = None, path: str = STORE_DIR, **kwargs):
+        store = cls(embedding, collection_name or uuid.uuid4().hex, path)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+    @classmethod
+    def from_existing_collection(cls, embedding, collection_name: str, path: str = STORE_DIR, **kwargs):
+        directory = Path(path) / collection_name
+        if not (directory / "manifest.json").exists() and not (directory / "docs.jsonl").exists():
+            raise FileNotFoundError(f"Collection {collection_name} not found in {path}")
+        return cls(embedding, collection_name, path)
+
+    @classmethod
+    def delete_collection(cls, collection_name: str, path: str = STORE_DIR):
+        shutil.rmtree(Path(path) / collection_name, ignore_errors=True)
@@ -0,0 +1,81 @@
+# Prompt assembly for the LLM nodes
+#
+# OpenAI caches the longest previously seen prompt prefix (from 1024 tokens
+# on) and bills and serves those tokens faster. A prefix only repeats if the
+# static parts come first, so every node builds its messages here in a fixed
+# order: static system prompt with its few-shot examples, then conversation
+# history, then retrieved context, then the user turn. Each call records
+# usage.prompt_tokens_details.cached_tokens per node so the cached-token
+# ratio and the latency with and without a cache hit can be compared.
+
+from threading import Lock
+import time
+
+_usage = {}
+_lock = Lock()
+
+
+def build_messages(system: str, user: str, history=(), context: str = None):
+    messages = [{"role": "system", "content": system}, *history]
+    if context is not None:
+        messages.append({"role": "system", "content": context})
+    messages.append({"role": "user", "content": user})
+    return messages
+
+
+def cached_tokens(response):
+    """
+    (prompt_tokens, cached_tokens) reported for one chat model response.
+    """
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("input_token_details", {}).get("cache_read", 0) or 0
+    token_usage = response.response_metadata.get("token_usage") or {}
+    details = token_usage.get("prompt_tokens_details") or {}
+    return token_usage.get("prompt_tokens", 0), details.get("cached_tokens", 0) or 0
+
+
+def record_usage(node: str, response, seconds: float):
+    if isinstance(response, dict):
+        # with_structured_output(..., include_raw=True)
+        response = response["raw"]
+    prompt, cached = cached_tokens(response)
+    with _lock:
+        stats = _usage.setdefault(node, {
+            "calls": 0, "prompt_tokens": 0, "cached_tokens": 0,
+            "cache_hit_calls": 0, "cache_hit_seconds": 0.0, "cache_miss_seconds": 0.0,
+        })
+        stats["calls"] += 1
+        stats["prompt_tokens"] += prompt
+        stats["cached_tokens"] += cached
+        if cached:
+            stats["cache_hit_calls"] += 1
+            stats["cache_hit_seconds"] += seconds
+        else:
+            stats["cache_miss_seconds"] += seconds
+
+
+async def ainvoke_llm(llm, node: str, messages):
+    """
+    llm.ainvoke(messages), recording prompt-cache usage and latency under node.
+    """
+    started = time.perf_counter()
+    response = await llm.ainvoke(messages)
+    record_usage(node, response, time.perf_counter() - started)
+    return response
+
+
+def usage_stats():
+    report = {}
+    with _lock:
+        for node, stats in _usage.items():
+            misses = stats["calls"] - stats["cache_hit_calls"]
+            report[node] = {
+                "calls": stats["calls"],
+                "prompt_tokens": stats["prompt_tokens"],
+                "cached_tokens": stats["cached_tokens"],
+                "cached_ratio": round(stats["cached_tokens"] / stats["prompt_tokens"], 4) if stats["prompt_tokens"] else 0.0,
+                "avg_ms_cache_hit": round(stats["cache_hit_seconds"] / stats["cache_hit_calls"] * 1000) if stats["cache_hit_calls"] else None,
+                "avg_ms_cache_miss": round(stats["cache_miss_seconds"] / misses * 1000) if misses else None,
+            }
+    return report
@@ -0,0 +1,219 @@
+# Semantic answer cache for /ask-stream
+#
+# Near-identical questions on the same collection are answered from earlier
+# results instead of rerunning the whole graph. Entries are keyed by
+# collection and query embedding; a lookup is a hit when the cosine
+# similarity to a stored query reaches SEMANTIC_CACHE_THRESHOLD. Entries
+# expire after SEMANTIC_CACHE_TTL seconds and the least recently used ones
+# are evicted past SEMANTIC_CACHE_MAX_ENTRIES per collection.
+#
+# Entries live in process memory, or in Valkey when SEMANTIC_CACHE_URL is set
+# (e.g. redis://valkey:6379) so that several server processes share them.
+
+from collections import OrderedDict
+from threading import Lock
+import base64
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+from redis import Redis
+
+CACHE_URL = os.getenv("SEMANTIC_CACHE_URL", "")
+THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "500"))
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._collections = {}
+        self._lock = Lock()
+
+    def entries(self, collection: str):
+        with self._lock:
+            return [(id_, *entry) for id_, entry in self._collections.get(collection, {}).items()]
+
+    def put(self, collection: str, id_: str, vector, payload, created: float):
+        with self._lock:
+            entries = self._collections.setdefault(collection, OrderedDict())
+            entries[id_] = (vector, payload, created)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def touch(self, collection: str, id_: str):
+        with self._lock:
+            entries = self._collections.get(collection)
+            if entries and id_ in entries:
+                entries.move_to_end(id_)
+
+    def delete(self, collection: str, ids):
+        with self._lock:
+            entries = self._collections.get(collection, {})
+            for id_ in ids:
+                entries.pop(id_, None)
+
+    def clear(self, collection: str):
+        with self._lock:
+            self._collections.pop(collection, None)
+
+
+class ValkeyBackend:
+    """
+    One hash of entries plus a sorted set of last-use times per collection.
+
+    Vectors are mirrored in process and only re-read when another process
+    bumps the collection's version key, so a lookup is a single GET.
+    """
+
+    def __init__(self, url: str, max_entries: int, ttl: float):
+        self.redis = Redis.from_url(url)
+        self.max_entries = max_entries
+        self.ttl = int(ttl)
+        self._mirror = {}
+
+    def _keys(self, collection: str):
+        key = f"semcache:{collection}"
+        return key, f"{key}:lru", f"{key}:version"
+
+    def entries(self, collection: str):
+        entries_key, _, version_key = self._keys(collection)
+        version = self.redis.get(version_key)
+        mirrored = self._mirror.get(collection)
+        if mirrored and mirrored[0] == version:
+            return mirrored[1]
+
+        rows = []
+        for id_, raw in self.redis.hgetall(entries_key).items():
+            entry = json.loads(raw)
+            vector = np.frombuffer(base64.b64decode(entry["vector"]), dtype=np.float32)
+            rows.append((id_.decode(), vector, entry["payload"], entry["created"]))
+        self._mirror[collection] = (version, rows)
+        return rows
+
+    def put(self, collection: str, id_: str, vector, payload, created: float):
+        entries_key, lru_key, version_key = self._keys(collection)
+        entry = {
+            "vector": base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode(),
+            "payload": payload,
+            "created": created,
+        }
+        pipe = self.redis.pipeline()
+        pipe.hset(entries_key, id_, json.dumps(entry))
+        pipe.zadd(lru_key, {id_: time.time()})
+        pipe.zcard(lru_key)
+        for key in (entries_key, lru_key, version_key):
+            pipe.expire(key, self.ttl)
+        count = pipe.execute()[2]
+        if count > self.max_entries:
+            evicted = [id_.decode() for id_, _ in self.redis.zpopmin(lru_key, count - self.max_entries)]
+            self.redis.hdel(entries_key, *evicted)
+        self.redis.incr(version_key)
+
+    def touch(self, collection: str, id_: str):
+        self.redis.zadd(self._keys(collection)[1], {id_: time.time()})
+
+    def delete(self, collection: str, ids):
+        entries_key, lru_key, version_key = self._keys(collection)
+        ids = list(ids)
+        if ids:
+            self.redis.hdel(entries_key, *ids)
+            self.redis.zrem(lru_key, *ids)
+            self.redis.incr(version_key)
+
+    def clear(self, collection: str):
+        self.redis.delete(*self._keys(collection))
+        self._mirror.pop(collection, None)
+
+
+class SemanticCache:
+    def __init__(
+        self,
+        embeddings,
+        url: str = CACHE_URL,
+        threshold: float = THRESHOLD,
+        ttl: float = TTL,
+        max_entries: int = MAX_ENTRIES,
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.backend = ValkeyBackend(url, max_entries, ttl) if url else MemoryBackend(max_entries)
+
+        self.hits = 0
+        self.misses = 0
+        self._lookup_seconds = 0.0
+        self._latency = {"hit": [0, 0.0], "miss": [0, 0.0]}
+        self._lock = Lock()
+
+    def lookup(self, collection: str, query: str):
+        """
+        Closest cached payload for the query, or None.
+
+        Returns (payload, similarity, query_vector); pass query_vector to
+        store() afterwards so the query is not embedded twice.
+        """
+        started = time.perf_counter()
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        vector /= max(np.linalg.norm(vector), 1e-12)
+
+        now = time.time()
+        entries = self.backend.entries(collection)
+        expired = [id_ for id_, _, _, created in entries if now - created > self.ttl]
+        if expired:
+            self.backend.delete(collection, expired)
+        entries = [entry for entry in entries if now - entry[3] <= self.ttl]
+
+        payload, similarity = None, 0.0
+        if entries:
+            scores = np.stack([entry[1] for entry in entries]) @ vector
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            if similarity >= self.threshold:
+                payload = entries[best][2]
+                self.backend.touch(collection, entries[best][0])
+
+        with self._lock:
+            self._lookup_seconds += time.perf_counter() - started
+            if payload is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return payload, similarity, vector
+
+    def store(self, collection: str, vector, payload):
+        self.backend.put(collection, uuid.uuid4().hex, vector, payload, time.time())
+
+    def clear(self, collection: str):
+        self.backend.clear(collection)
+
+    def observe(self, hit: bool, seconds: float):
+        """
+        Record the end-to-end latency of a request served from the cache or the graph.
+        """
+        with self._lock:
+            bucket = self._latency["hit" if hit else "miss"]
+            bucket[0] += 1
+            bucket[1] += seconds
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "avg_lookup_ms": round(self._lookup_seconds / lookups * 1000, 2) if lookups else 0.0,
+                "avg_hit_latency_ms": _average_ms(self._latency["hit"]),
+                "avg_miss_latency_ms": _average_ms(self._latency["miss"]),
+            }
+
+
+def _average_ms(bucket):
+    count, seconds = bucket
+    return round(seconds / count * 1000, 2) if count else 0.0
@@ -0,0 +1,130 @@
+# Embedding size and Qdrant collection layout
+#
+# EMBEDDING_DIMENSIONS asks text-embedding-3-large for shortened vectors
+# (e.g. 1024 instead of 3072). QDRANT_QUANTIZATION=scalar|binary keeps an
+# int8 / 1-bit copy of every vector in RAM, moves the float32 originals to
+# disk, and rescores only the oversampled top candidates at full precision.
+# Indexing and retrieval must run with the same settings.
+#
+# VECTOR_BACKEND=numpy keeps collections in-process (see numpy_store.py)
+# instead of on the Qdrant server.
+
+import os
+import uuid
+
+from dotenv import load_dotenv
+from langchain_openai import OpenAIEmbeddings
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient, models
+from numpy_store import NumpyVectorStore
+
+load_dotenv()
+
+EMBEDDING_MODEL = "text-embedding-3-large"
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0")) or None
+QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "").lower()
+OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", "2.0"))
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant").lower()
+QDRANT_URL = os.getenv("QDRANT_URL", "http://vector-db:6333")
+
+
+def make_embeddings():
+    return OpenAIEmbeddings(model=EMBEDDING_MODEL, dimensions=EMBEDDING_DIMENSIONS)
+
+
+def collection_options():
+    if QUANTIZATION == "scalar":
+        config = models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    elif QUANTIZATION == "binary":
+        config = models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    elif not QUANTIZATION:
+        return {}
+    else:
+        raise ValueError(f"Unknown QDRANT_QUANTIZATION {QUANTIZATION!r}, use scalar or binary")
+    return {"quantization_config": config}
+
+
+def vector_params():
+    # originals only need to be read for rescoring once a quantized copy is in RAM
+    return {"on_disk": True} if QUANTIZATION else {}
+
+
+def search_params():
+    if not QUANTIZATION:
+        return None
+    return models.SearchParams(
+        quantization=models.QuantizationSearchParams(ignore=False, rescore=True, oversampling=OVERSAMPLING)
+    )
+
+
+def open_vector_store(collection_name: str, embedding, url: str = None, api_key: str = None):
+    if VECTOR_BACKEND == "numpy":
+        return NumpyVectorStore.from_existing_collection(embedding=embedding, collection_name=collection_name)
+    return QdrantVectorStore.from_existing_collection(
+        url=url or QDRANT_URL,
+        api_key=api_key,
+        collection_name=collection_name,
+        embedding=embedding,
+    )
+
+
+def create_vector_store(documents, collection_name: str, embedding, url: str = None, api_key: str = None, **kwargs):
+    if VECTOR_BACKEND == "numpy":
+        return NumpyVectorStore.from_documents(documents, embedding, collection_name=collection_name)
+    return QdrantVectorStore.from_documents(
+        documents=documents,
+        url=url or QDRANT_URL,
+        api_key=api_key,
+        collection_name=collection_name,
+        embedding=embedding,
+        collection_create_options=collection_options(),
+        vector_params=vector_params(),
+        **kwargs,
+    )
+
+
+def get_or_create_vector_store(collection_name: str, embedding, url: str = None, api_key: str = None):
+    """
+    Open a collection for incremental add_documents calls, creating it if needed.
+    """
+    if VECTOR_BACKEND == "numpy":
+        return NumpyVectorStore(embedding, collection_name)
+    return QdrantVectorStore.construct_instance(
+        embedding=embedding,
+        client_options={"url": url or QDRANT_URL, "api_key": api_key},
+        collection_name=collection_name,
+        collection_create_options=collection_options(),
+        vector_params=vector_params(),
+    )
+
+
+def add_embedded_documents(vector_store, documents, vectors, ids=None):
+    """
+    Store documents whose vectors were computed upstream, without embedding them again.
+    """
+    ids = ids or [uuid.uuid4().hex for _ in documents]
+    texts = [doc.page_content for doc in documents]
+    metadatas = [doc.metadata for doc in documents]
+    if isinstance(vector_store, NumpyVectorStore):
+        return vector_store.add_vectors(texts, vectors, metadatas, ids)
+
+    points = [
+        models.PointStruct(
+            id=id_,
+            vector={vector_store.vector_name: list(vector)},
+            payload={vector_store.content_payload_key: text, vector_store.metadata_payload_key: metadata},
+        )
+        for id_, vector, text, metadata in zip(ids, vectors, texts, metadatas)
+    ]
+    vector_store.client.upsert(collection_name=vector_store.collection_name, points=points)
+    return ids
+
+
+def delete_vector_store(collection_name: str, url: str = None, api_key: str = None):
+    if VECTOR_BACKEND == "numpy":
+        NumpyVectorStore.delete_collection(collection_name)
+        return
+    client = QdrantClient(url=url or QDRANT_URL, api_key=api_key)
+    client.delete_collection(collection_name=collection_name)
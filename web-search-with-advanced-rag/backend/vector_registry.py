@@ -0,0 +1,145 @@
+# Process-wide vector store registry
+#
+# QdrantVectorStore.from_existing_collection builds a new client and checks
+# the collection on every call, so each question paid for a connection and a
+# collection-info request before its first search. The registry owns one
+# long-lived QdrantClient (HTTP keep-alive, or gRPC with QDRANT_PREFER_GRPC=1)
+# and keeps opened stores in an LRU with a TTL. Deleting a collection drops
+# its cached store. An AsyncQdrantClient with the same settings serves the
+# async graph nodes. BM25 indexes (sparse_index.py) share the same cache.
+
+from collections import OrderedDict
+from threading import Lock
+import asyncio
+import os
+import time
+
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from numpy_store import NumpyVectorStore
+from sparse_index import BM25Index
+from vector_config import VECTOR_BACKEND, QDRANT_URL
+
+MAX_STORES = int(os.getenv("VECTOR_REGISTRY_SIZE", "64"))
+STORE_TTL = float(os.getenv("VECTOR_REGISTRY_TTL", "600"))
+PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "0") == "1"
+# cached in place of a missing BM25 index, so dense-only collections are not
+# looked up on disk at every query
+NO_INDEX = object()
+
+
+class VectorStoreRegistry:
+    def __init__(
+        self,
+        url: str = None,
+        api_key: str = None,
+        prefer_grpc: bool = PREFER_GRPC,
+        max_stores: int = MAX_STORES,
+        ttl: float = STORE_TTL,
+    ):
+        self.url = url or QDRANT_URL
+        self.api_key = api_key
+        self.prefer_grpc = prefer_grpc
+        self.max_stores = max_stores
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self._client = None
+        self._async_client = None
+        self._stores = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = QdrantClient(url=self.url, api_key=self.api_key, prefer_grpc=self.prefer_grpc)
+            return self._client
+
+    @property
+    def async_client(self):
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = AsyncQdrantClient(url=self.url, api_key=self.api_key, prefer_grpc=self.prefer_grpc)
+            return self._async_client
+
+    def _open(self, collection_name: str, embedding):
+        if VECTOR_BACKEND == "numpy":
+            return NumpyVectorStore.from_existing_collection(embedding=embedding, collection_name=collection_name)
+        if not self.client.collection_exists(collection_name):
+            raise FileNotFoundError(f"Collection {collection_name!r} not found")
+        return QdrantVectorStore(client=self.client, collection_name=collection_name, embedding=embedding)
+
+    def _cached(self, collection_name: str):
+        with self._lock:
+            entry = self._stores.get(collection_name)
+            if entry and time.monotonic() - entry[1] < self.ttl:
+                self._stores.move_to_end(collection_name)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def _remember(self, collection_name: str, store):
+        with self._lock:
+            self._stores[collection_name] = (store, time.monotonic())
+            self._stores.move_to_end(collection_name)
+            while len(self._stores) > self.max_stores:
+                self._stores.popitem(last=False)
+        return store
+
+    def get(self, collection_name: str, embedding):
+        """
+        Cached store for an existing collection. Raises FileNotFoundError if there is none.
+        """
+        store = self._cached(collection_name)
+        if store is None:
+            store = self._remember(collection_name, self._open(collection_name, embedding))
+        return store
+
+    async def aget(self, collection_name: str, embedding):
+        """
+        Same as get(), but opening an uncached collection happens off the event loop.
+        """
+        store = self._cached(collection_name)
+        if store is None:
+            store = self._remember(collection_name, await asyncio.to_thread(self._open, collection_name, embedding))
+        return store
+
+    async def aget_sparse(self, collection_name: str):
+        """
+        Cached BM25 index of a collection, or None if it was indexed without one.
+        """
+        key = ("bm25", collection_name)
+        index = self._cached(key)
+        if index is None:
+            index = await asyncio.to_thread(BM25Index.open, collection_name)
+            index = self._remember(key, NO_INDEX if index is None else index)
+        return None if index is NO_INDEX else index
+
+    def invalidate(self, collection_name: str):
+        with self._lock:
+            self._stores.pop(collection_name, None)
+            self._stores.pop(("bm25", collection_name), None)
+
+    def delete(self, collection_name: str):
+        self.invalidate(collection_name)
+        BM25Index.delete_collection(collection_name)
+        if VECTOR_BACKEND == "numpy":
+            NumpyVectorStore.delete_collection(collection_name)
+        else:
+            self.client.delete_collection(collection_name=collection_name)
+
+    async def aclose(self):
+        with self._lock:
+            self._stores.clear()
+            client, async_client = self._client, self._async_client
+            self._client = self._async_client = None
+        if client is not None:
+            client.close()
+        if async_client is not None:
+            await async_client.close()
+
+
+registry = VectorStoreRegistry(api_key=os.getenv("QDRANT_API_KEY"))
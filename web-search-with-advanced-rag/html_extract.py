@@ -0,0 +1,154 @@
+# HTML to text extraction before splitting
+#
+# RecursiveUrlLoader hands back raw HTML, so scripts, styles, nav bars and
+# class names end up in chunks and embeddings. This stage runs a streaming
+# stdlib parser (no DOM is built), drops boilerplate elements, keeps the
+# <main>/<article> content when the page has one and runs pages on a
+# process pool. A <header> inside <main>/<article> is the article's own and is
+# kept; from site-level headers only the <h1> page title is kept. The stats report HTML bytes in vs. text tokens out.
+
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+import os
+import re
+
+from langchain_core.documents import Document
+from token_counter import count_batch
+
+DROP_TAGS = {
+    "head", "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "nav", "header", "footer", "aside", "form", "button", "select",
+}
+DROP_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search", "menu"}
+MAIN_TAGS = {"main", "article"}
+BLOCK_TAGS = {
+    "p", "div", "section", "br", "hr", "li", "ul", "ol", "dl", "dt", "dd", "tr", "table",
+    "pre", "blockquote", "h1", "h2", "h3", "h4", "h5", "h6",
+}
+VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "source", "wbr", "area", "col", "embed"}
+# below this the <main> block is probably a stub and the body is a better bet
+MIN_MAIN_CHARS = 200
+WORKERS = int(os.getenv("EXTRACT_WORKERS", "0")) or None
+
+_pool = None
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skip_tag = None
+        self.skip_depth = 0
+        self.main_depth = 0
+        self.title_depth = 0
+        self.parts = []
+        self.main_parts = []
+        self.title_parts = []
+
+    def _append(self, text: str):
+        self.parts.append(text)
+        if self.main_depth:
+            self.main_parts.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        if self.skip_tag:
+            if tag == self.skip_tag:
+                self.skip_depth += 1
+            elif tag == "h1" and self.skip_tag == "header":
+                self.title_depth += 1
+                self._append("\n")
+            return
+        # an article's own <header> stays, only site-level ones are dropped
+        drop = tag in DROP_TAGS and not (tag == "header" and self.main_depth)
+        if drop or dict(attrs).get("role") in DROP_ROLES:
+            if tag not in VOID_TAGS:
+                self.skip_tag = tag
+                self.skip_depth = 1
+            return
+        if tag in MAIN_TAGS:
+            self.main_depth += 1
+        if tag in BLOCK_TAGS:
+            self._append("\n")
+
+    def handle_endtag(self, tag):
+        if self.skip_tag:
+            if tag == "h1" and self.title_depth:
+                self.title_depth -= 1
+                self._append("\n")
+            elif tag == self.skip_tag:
+                self.skip_depth -= 1
+                if not self.skip_depth:
+                    self.skip_tag = None
+            return
+        if tag in BLOCK_TAGS:
+            self._append("\n")
+        if tag in MAIN_TAGS and self.main_depth:
+            self.main_depth -= 1
+
+    def handle_data(self, data):
+        if self.title_depth:
+            self.title_parts.append(data)
+            self._append(data)
+        elif not self.skip_tag:
+            self._append(data)
+
+
+def _clean(parts):
+    lines = (re.sub(r"\s+", " ", line).strip() for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def extract_text(html: str):
+    """
+    Main readable text of an HTML page, without scripts, styles and navigation.
+    """
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+
+    main = _clean(parser.main_parts)
+    if len(main) >= MIN_MAIN_CHARS:
+        # the page title often sits in the site header, outside <main>
+        title = _clean(parser.title_parts)
+        return f"{title}\n{main}" if title and title not in main else main
+    return _clean(parser.parts)
+
+
+def raw_html(html: str):
+    return html
+
+
+EXTRACTORS = {
+    "main-content": extract_text,
+    "raw": raw_html,
+}
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(WORKERS)
+    return _pool
+
+
+def extract_documents(docs, extractor=extract_text):
+    """
+    Run the extractor over every document on the process pool.
+
+    Returns the extracted documents (metadata kept, empty pages dropped)
+    and a dict with bytes_in, tokens_out and the page counts.
+    """
+    docs = list(docs)
+    texts = list(get_pool().map(extractor, [doc.page_content for doc in docs], chunksize=8))
+
+    extracted = [
+        Document(page_content=text, metadata=doc.metadata)
+        for doc, text in zip(docs, texts)
+        if text.strip()
+    ]
+    stats = {
+        "pages_in": len(docs),
+        "pages_out": len(extracted),
+        "bytes_in": sum(len(doc.page_content.encode()) for doc in docs),
+        "tokens_out": sum(count_batch(doc.page_content for doc in extracted)),
+    }
+    return extracted, stats
@@ -5,55 +5,72 @@ from langchain_openai import OpenAIEmbeddings
 from langchain_community.document_loaders import WebBaseLoader
 from dotenv import load_dotenv
 from langchain_qdrant import QdrantVectorStore
-from langchain_community.document_loaders import RecursiveUrlLoader
+from crawler import crawl_documents
+from embedding_cache import CachedEmbeddings
+from indexer import sync_documents
+from html_extract import extract_documents
 from collections import defaultdict
+import asyncio
 import re
 
 load_dotenv()
 
-#Read all the topics
-base = "https://docs.chaicode.com"
 
-sections = defaultdict(list)
-pattern = re.compile(r"/youtube/([^/]+)/")
+def main():
+    #Read all the topics
+    base = "https://docs.chaicode.com"
 
-loader = RecursiveUrlLoader(base, max_depth=4)
-docs = loader.load()
+    sections = defaultdict(list)
+    pattern = re.compile(r"/youtube/([^/]+)/")
 
-print(len(docs))
-for doc in docs:
-    url = doc.metadata.get("source", "")
-    match = pattern.search(url)
-    if match:
-        section = match.group(1)
-        sections[section].append(url)
+    docs, extract_stats = extract_documents(asyncio.run(crawl_documents(base, max_depth=4)))
 
-# Print grouped results\
-for section, urls in sections.items():
-    print(f"\nSection: {section} ({len(urls)} URLs)")
-    for url in urls:
-        print("  ", url)
+    print(f"Extracted {extract_stats['bytes_in'] / 1024:.0f} KB of HTML into {extract_stats['tokens_out']} tokens")
 
+    print(len(docs))
+    for doc in docs:
+        url = doc.metadata.get("source", "")
+        match = pattern.search(url)
+        if match:
+            section = match.group(1)
+            sections[section].append(url)
 
-# Text splitting
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=400
-)
-texts_split = text_splitter.split_documents(documents=docs)
+    # Print grouped results\
+    for section, urls in sections.items():
+        print(f"\nSection: {section} ({len(urls)} URLs)")
+        for url in urls:
+            print("  ", url)
 
-# print(texts_split)
 
-# Vector embeddings
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-print("embeddings")
+    # Text splitting
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=400,
+        add_start_index=True
+    )
+    texts_split = text_splitter.split_documents(documents=docs)
 
-# Using [embeddings] create embeddings of [texts_split] and store in DB
-vector_store = QdrantVectorStore.from_documents(
-    documents=texts_split,
-    url="http://vector-db:6333",
-    collection_name="web_vector",
-    embedding=embeddings
-)
+    # print(texts_split)
 
-print("Indexing of Documents Done...")
\ No newline at end of file
+    # Vector embeddings
+    embeddings = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-large"))
+    print("embeddings")
+
+    # Using [embeddings] embed only new or changed chunks of [texts_split] and store in DB
+    vector_store = QdrantVectorStore.construct_instance(
+        embedding=embeddings,
+        client_options={"url": "http://vector-db:6333"},
+        collection_name="web_vector"
+    )
+    stats = sync_documents(texts_split, vector_store)
+
+    print(f"Chunks added: {stats['added']}, deleted: {stats['deleted']}, unchanged: {stats['unchanged']}")
+
+    print(f"Embedding cache: {embeddings.hits} hits, {embeddings.misses} misses")
+    print("Indexing of Documents Done...")
+
+
+# extract_documents starts a process pool; under spawn every worker re-imports
+# this module, so the script must not run on import
+if __name__ == "__main__":
+    main()
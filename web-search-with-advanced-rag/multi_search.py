@@ -0,0 +1,97 @@
+# Multi-query retrieval
+#
+# similarity_search on each expanded query costs one embeddings request and
+# one search request per query. search_many embeds all queries in a single
+# embeddings request and sends every search in one Qdrant query_batch_points
+# call, so N queries take 2 round trips instead of 2N. asearch_many does the
+# same without blocking the event loop.
+
+from qdrant_client import models
+
+
+def search_many(vector_store, queries, k: int = 4, search_params=None):
+    """
+    Top-k (Document, score) pairs for each query, grouped in query order.
+    """
+    queries = list(queries)
+    if not queries:
+        return []
+    vectors = vector_store.embeddings.embed_documents(queries)
+
+    if hasattr(vector_store, "similarity_search_with_score_by_vectors"):
+        # in-process store (numpy_store.py): one matrix product for all queries
+        return vector_store.similarity_search_with_score_by_vectors(vectors, k)
+
+    responses = vector_store.client.query_batch_points(
+        collection_name=vector_store.collection_name,
+        requests=_requests(vector_store, vectors, k, search_params),
+    )
+    return _group_points(vector_store, responses)
+
+
+async def asearch_many(vector_store, queries, client, k: int = 4, search_params=None):
+    """
+    Async search_many. client is an AsyncQdrantClient for the store's server.
+    """
+    queries = list(queries)
+    if not queries:
+        return []
+    vectors = await vector_store.embeddings.aembed_documents(queries)
+
+    if hasattr(vector_store, "similarity_search_with_score_by_vectors"):
+        return vector_store.similarity_search_with_score_by_vectors(vectors, k)
+
+    responses = await client.query_batch_points(
+        collection_name=vector_store.collection_name,
+        requests=_requests(vector_store, vectors, k, search_params),
+    )
+    return _group_points(vector_store, responses)
+
+
+def _requests(vector_store, vectors, k: int, search_params):
+    return [
+        models.QueryRequest(
+            query=list(vector),
+            using=vector_store.vector_name,
+            limit=k,
+            params=search_params,
+            with_payload=True,
+        )
+        for vector in vectors
+    ]
+
+
+def _group_points(vector_store, responses):
+    return [
+        [
+            (
+                vector_store._document_from_point(
+                    point,
+                    vector_store.collection_name,
+                    vector_store.content_payload_key,
+                    vector_store.metadata_payload_key,
+                ),
+                point.score,
+            )
+            for point in response.points
+        ]
+        for response in responses
+    ]
+
+
+def reciprocal_rank_fusion(grouped_hits, k: int = 60, limit: int = None):
+    """
+    Merge per-query hit lists into one ranking by summing 1 / (k + rank).
+
+    The same point retrieved by several queries is kept once (by its _id
+    metadata, falling back to its text) and ranks higher for each list it
+    appears in. Returns (Document, fused_score) pairs, best first.
+    """
+    fused = {}
+    for hits in grouped_hits:
+        for rank, (doc, _) in enumerate(hits, 1):
+            key = doc.metadata.get("_id", doc.page_content)
+            entry = fused.setdefault(key, [doc, 0.0])
+            entry[1] += 1.0 / (k + rank)
+    ranked = sorted(fused.values(), key=lambda entry: entry[1], reverse=True)
+    return [(doc, score) for doc, score in ranked[:limit]]
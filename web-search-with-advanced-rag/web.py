@@ -10,6 +10,7 @@ from typing import Annotated
 from langgraph.graph.message import add_messages
 from langgraph.graph import StateGraph, START, END
 import re
+from multi_search import search_many
 
 # nodes
 # state, graph, invoke and compile
@@ -101,10 +102,10 @@ Sub-Queries:
 def generate_answers(state: State):
     state['temp_result'] = []
     enhanced_queries = state['sub_queries']
-    for enhanced_query in enhanced_queries:
-        search_results = vector_db.similarity_search(
-            query=enhanced_query
-        )
+    # embed and search all sub-queries in one round trip each
+    grouped_hits = search_many(vector_db, enhanced_queries)
+    for enhanced_query, hits in zip(enhanced_queries, grouped_hits):
+        search_results = [doc for doc, _ in hits]
 
         context = "\n\n\n".join([
         f"Page Content: {result.page_content}\n\nPage Description: {result.metadata['description']}\n\nUrl: {result.metadata['source']}"
@@ -1,2 +1,4 @@
 export $(grep -v '^#' .env | xargs -d'\n')
+# shared token_counter / tokenizer modules
+export PYTHONPATH="$PWD/01-Tokenization${PYTHONPATH:+:$PYTHONPATH}"
 rq worker --with-scheduler --url redis://valkey:6379
\ No newline at end of file